@@ -5,7 +5,7 @@ Tools for working with Mobility Data Specification Provider data.
 from .api import Client
 from .db import data_engine, Database
 from .encoding import JsonEncoder, TimestampDecoder, TimestampEncoder
-from .files import ConfigFile, DataFile
+from .files import ConfigFile, DataFile, IndexFile
 from .providers import Provider, Registry
 from .schemas import STATUS_CHANGES, TRIPS, EVENTS, VEHICLES, DataValidator, Schema
 from .versions import UnsupportedVersionError, Version
@@ -0,0 +1,457 @@
+"""
+Aggregate MDS Provider data into counts by area and time.
+"""
+
+import json
+import math
+
+import fiona
+import numpy
+import pandas as pd
+import shapely
+import shapely.geometry
+
+import mds.geometry
+from .encoding import TimestampDecoder
+
+
+# the default number of records binned at a time
+_CHUNKSIZE = 100000
+
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+
+class Grid():
+    """
+    A regular grid of square cells, labeled "column,row" counting from an origin.
+    """
+
+    def __init__(self, size, origin=(0.0, 0.0)):
+        """
+        Parameters:
+            size: float
+                The width and height of each cell, in coordinate units (i.e. degrees for MDS data).
+
+            origin: tuple (x, y), optional
+                The corner of cell "0,0". By default, (0, 0).
+        """
+        if size <= 0:
+            raise ValueError("Grid size must be positive.")
+
+        self.size = float(size)
+        self.origin = (float(origin[0]), float(origin[1]))
+
+    def __repr__(self):
+        return f"<mds.aggregate.Grid ({self.size}, {self.origin})>"
+
+    def assign(self, coords):
+        """
+        Get the label of the cell containing each point.
+
+        Parameters:
+            coords: numpy.ndarray
+                Of shape (n, 2), with the (x, y) of each point.
+
+        Return:
+            numpy.ndarray
+                Of object, the label of each point's cell, or None for missing points.
+        """
+        valid = numpy.isfinite(coords).all(axis=1)
+        columns = numpy.floor((coords[valid, 0] - self.origin[0]) / self.size).astype(numpy.int64)
+        rows = numpy.floor((coords[valid, 1] - self.origin[1]) / self.size).astype(numpy.int64)
+
+        return _labels(valid, columns, rows)
+
+    def polygon(self, label):
+        """
+        Get the Polygon of a cell from its label.
+        """
+        column, row = (int(v) for v in label.split(","))
+        min_x = self.origin[0] + column * self.size
+        min_y = self.origin[1] + row * self.size
+        return shapely.geometry.box(min_x, min_y, min_x + self.size, min_y + self.size)
+
+
+class HexGrid():
+    """
+    A grid of pointy-top hexagonal cells centered on an origin, labeled "q,r" by axial coordinates.
+    """
+
+    def __init__(self, size, origin=(0.0, 0.0)):
+        """
+        Parameters:
+            size: float
+                The distance from the center to each corner of a cell, in coordinate units
+                (i.e. degrees for MDS data).
+
+            origin: tuple (x, y), optional
+                The center of cell "0,0". By default, (0, 0).
+        """
+        if size <= 0:
+            raise ValueError("HexGrid size must be positive.")
+
+        self.size = float(size)
+        self.origin = (float(origin[0]), float(origin[1]))
+
+    def __repr__(self):
+        return f"<mds.aggregate.HexGrid ({self.size}, {self.origin})>"
+
+    def assign(self, coords):
+        """
+        Get the label of the cell containing each point.
+
+        Parameters:
+            coords: numpy.ndarray
+                Of shape (n, 2), with the (x, y) of each point.
+
+        Return:
+            numpy.ndarray
+                Of object, the label of each point's cell, or None for missing points.
+        """
+        valid = numpy.isfinite(coords).all(axis=1)
+        x = (coords[valid, 0] - self.origin[0]) / self.size
+        y = (coords[valid, 1] - self.origin[1]) / self.size
+
+        # fractional axial coordinates, rounded to the nearest cell in cube coordinates
+        q = math.sqrt(3) / 3 * x - y / 3
+        r = 2 / 3 * y
+        s = -q - r
+
+        rq, rr, rs = numpy.round(q), numpy.round(r), numpy.round(s)
+        dq, dr, ds = numpy.abs(rq - q), numpy.abs(rr - r), numpy.abs(rs - s)
+
+        fix_q = (dq > dr) & (dq > ds)
+        fix_r = ~fix_q & (dr > ds)
+        rq[fix_q] = -rr[fix_q] - rs[fix_q]
+        rr[fix_r] = -rq[fix_r] - rs[fix_r]
+
+        return _labels(valid, rq.astype(numpy.int64), rr.astype(numpy.int64))
+
+    def polygon(self, label):
+        """
+        Get the Polygon of a cell from its label.
+        """
+        q, r = (int(v) for v in label.split(","))
+        center_x = self.origin[0] + self.size * math.sqrt(3) * (q + r / 2)
+        center_y = self.origin[1] + self.size * 1.5 * r
+
+        angles = [math.radians(60 * i - 30) for i in range(6)]
+        return shapely.geometry.Polygon([
+            (center_x + self.size * math.cos(a), center_y + self.size * math.sin(a)) for a in angles
+        ])
+
+
+class Zones():
+    """
+    User-supplied zone polygons, queried through a spatial index.
+    """
+
+    def __init__(self, zones):
+        """
+        Parameters:
+            zones: dict
+                Mapping each zone's label to its shapely Polygon (or MultiPolygon).
+                Points inside overlapping zones are assigned to the first one.
+        """
+        self.zones = dict(zones)
+        self._labels = numpy.array(list(self.zones.keys()), dtype=object)
+        self._tree = shapely.STRtree(list(self.zones.values()))
+
+    def __repr__(self):
+        return f"<mds.aggregate.Zones ({len(self.zones)} zones)>"
+
+    @classmethod
+    def parse(cls, zones_file, label):
+        """
+        Read zones from a geojson file.
+
+        Parameters:
+            zones_file: str
+                A path to a local file with zone features in geojson format.
+
+            label: str
+                The name of the feature property holding each zone's label.
+
+        Return:
+            Zones
+        """
+        with fiona.open(zones_file) as features:
+            zones = [(f["properties"][label], shapely.geometry.shape(f["geometry"])) for f in features]
+
+        return cls(dict(zones))
+
+    def assign(self, coords):
+        """
+        Get the label of the zone containing each point.
+
+        Parameters:
+            coords: numpy.ndarray
+                Of shape (n, 2), with the (x, y) of each point.
+
+        Return:
+            numpy.ndarray
+                Of object, the label of each point's zone, or None for points outside every zone.
+        """
+        labels = numpy.full(len(coords), None, dtype=object)
+
+        valid = numpy.flatnonzero(numpy.isfinite(coords).all(axis=1))
+        if len(valid) == 0 or len(self.zones) == 0:
+            return labels
+
+        points, zones = self._tree.query(shapely.points(coords[valid]), predicate="within")
+
+        # the first zone of each point
+        order = numpy.lexsort((zones, points))
+        points, zones = points[order], zones[order]
+        first = numpy.unique(points, return_index=True)[1]
+
+        labels[valid[points[first]]] = self._labels[zones[first]]
+        return labels
+
+    def polygon(self, label):
+        """
+        Get the Polygon of a zone from its label.
+        """
+        return self.zones[label]
+
+
+def points(values, which="first"):
+    """
+    Extract the coordinates of many locations or routes at once.
+
+    Parameters:
+        values: iterable
+            Of GeoJSON Point Features (e.g. event_location), FeatureCollections of them (e.g. route),
+            their compact Location and Route, or their JSON text (e.g. from a database).
+
+        which: str, optional
+            The point of each route to extract: first (default) or last.
+
+    Return:
+        numpy.ndarray
+            Of shape (n, 2), with the (longitude, latitude) of each value. NaN where a value is missing.
+    """
+    if which not in ("first", "last"):
+        raise ValueError("which must be one of first, last.")
+
+    index = 0 if which == "first" else -1
+    features = []
+
+    for value in values:
+        if isinstance(value, str):
+            value = json.loads(value)
+
+        if isinstance(value, mds.geometry.Route):
+            value = value.locations[index] if len(value.coordinates) else None
+        elif isinstance(value, dict) and value.get("type") == "FeatureCollection":
+            value = value["features"][index] if value.get("features") else None
+
+        features.append(value)
+
+    return mds.geometry.coordinates(features)
+
+
+def counts(data, zoning, location="event_location", time="event_time", freq="h", **kwargs):
+    """
+    Count records by zone and time bucket.
+
+    Parameters:
+        data: DataFrame, list, tuple (Version, DataFrame)
+            The records to count, e.g. from DataFile.load_dataframe() or a database query.
+
+        zoning: Grid, HexGrid, Zones
+            How to bin record locations into zones.
+
+        location: str, optional
+            The column holding each record's location or route. By default, event_location.
+
+        time: str, optional
+            The column holding each record's time. By default, event_time.
+
+        freq: str, optional
+            The size of each time bucket, as a pandas frequency string. By default, one hour.
+
+        by: str, list, optional
+            Other columns to count by, e.g. event_type or provider_name.
+
+        which: str, optional
+            The point of each route to count: first (default) or last.
+
+        chunksize: int, optional
+            The number of records to bin at a time.
+
+    Return:
+        DataFrame
+            With columns time, zone, any by columns, and count. Records without a zone or time are left out.
+    """
+    df = _dataframe(data)
+    by = kwargs.get("by", [])
+    by = [by] if isinstance(by, str) else list(by)
+    which = kwargs.get("which", "first")
+    chunksize = kwargs.get("chunksize", _CHUNKSIZE)
+
+    keys = ["time", "zone", *by]
+    decoder = TimestampDecoder()
+    results = []
+
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+
+        binned = pd.DataFrame({
+            "time": decoder.decode_many(chunk[time]).dt.floor(freq).array,
+            "zone": zoning.assign(points(chunk[location], which=which)),
+            **{col: chunk[col].values for col in by}
+        })
+
+        results.append(binned.dropna(subset=["time", "zone"]).groupby(keys, sort=False, dropna=False).size())
+
+    return _total(results, keys)
+
+
+def trip_starts(trips, zoning, freq="h", **kwargs):
+    """
+    Count trips by the zone and time bucket of their start, from the first point of each route.
+
+    See counts() for parameters.
+    """
+    return counts(trips, zoning, location="route", time="start_time", freq=freq, which="first", **kwargs)
+
+
+def trip_ends(trips, zoning, freq="h", **kwargs):
+    """
+    Count trips by the zone and time bucket of their end, from the last point of each route.
+
+    See counts() for parameters.
+    """
+    return counts(trips, zoning, location="route", time="end_time", freq=freq, which="last", **kwargs)
+
+
+def availability(status_changes, zoning, freq="h", **kwargs):
+    """
+    Count vehicles available in each zone at the start of each time bucket.
+
+    A vehicle is available at its event_location from a status change with event_type=available,
+    until its next status change.
+
+    Parameters:
+        status_changes: DataFrame, list, tuple (Version, DataFrame)
+            The status changes of each vehicle, e.g. from DataFile.load_dataframe() or a database query.
+
+        zoning: Grid, HexGrid, Zones
+            How to bin vehicle locations into zones.
+
+        freq: str, optional
+            The size of each time bucket, as a fixed pandas frequency string (e.g. 15min). By default, one hour.
+
+        start_time: datetime, optional
+            Only count time buckets from this time.
+
+        end_time: datetime, optional
+            Only count time buckets before this time. By default, vehicles available at their
+            last status change are counted up to the last status change of all vehicles.
+
+        by: str, list, optional
+            Other columns to count by, e.g. provider_name or vehicle_type.
+
+        chunksize: int, optional
+            The number of availability intervals to expand into time buckets at a time.
+
+    Return:
+        DataFrame
+            With columns time, zone, any by columns, and count.
+    """
+    df = _dataframe(status_changes)
+    by = kwargs.get("by", [])
+    by = [by] if isinstance(by, str) else list(by)
+    chunksize = kwargs.get("chunksize", _CHUNKSIZE)
+    keys = ["time", "zone", *by]
+
+    step = pd.Timedelta(freq) // pd.Timedelta(milliseconds=1)
+    if step <= 0:
+        raise ValueError("freq must be at least one millisecond.")
+
+    events = pd.DataFrame({
+        "device_id": df["device_id"].astype(str).values,
+        "time": _millis(df["event_time"]).values,
+        "available": (df["event_type"] == "available").values,
+        "location": df["event_location"].values,
+        **{col: df[col].values for col in by}
+    }).dropna(subset=["time"])
+    events["time"] = events["time"].astype(numpy.int64)
+    events = events.sort_values(["device_id", "time"], kind="stable")
+
+    # each vehicle's availability lasts until its next status change, or the end
+    end_time = kwargs.get("end_time")
+    end = _millis([end_time]).iloc[0] if end_time is not None else (events["time"].max() if len(events) else 0)
+    until = events.groupby("device_id", sort=False)["time"].shift(-1).fillna(end).astype(numpy.int64).values
+
+    start_time = kwargs.get("start_time")
+    start = _millis([start_time]).iloc[0] if start_time is not None else None
+
+    available = events["available"].values
+    intervals = events[available].assign(until=numpy.minimum(until[available], end))
+    intervals = intervals[intervals["until"] > intervals["time"]]
+
+    results = []
+
+    for chunk_start in range(0, len(intervals), chunksize):
+        chunk = intervals.iloc[chunk_start:chunk_start + chunksize]
+        zone = zoning.assign(points(chunk["location"]))
+
+        # the bucket starts within each interval [time, until)
+        first = -(-chunk["time"].values // step) * step
+        if start is not None:
+            first = numpy.maximum(first, -(-start // step) * step)
+        buckets = numpy.maximum(0, -((first - chunk["until"].values) // step))
+
+        rows = numpy.repeat(numpy.arange(len(chunk)), buckets)
+        offsets = numpy.arange(len(rows)) - numpy.repeat(numpy.cumsum(buckets) - buckets, buckets)
+
+        expanded = pd.DataFrame({
+            "time": pd.to_datetime(first[rows] + offsets * step, unit="ms", utc=True),
+            "zone": zone[rows],
+            **{col: chunk[col].values[rows] for col in by}
+        })
+
+        results.append(expanded.dropna(subset=["zone"]).groupby(keys, sort=False, dropna=False).size())
+
+    return _total(results, keys)
+
+
+def _dataframe(data):
+    """
+    Get a DataFrame of records from a DataFrame, a list of records, or a (Version, DataFrame) tuple.
+    """
+    if isinstance(data, tuple) and len(data) == 2:
+        data = data[1]
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame.from_records(list(data))
+
+
+def _labels(valid, first, second):
+    """
+    Join pairs of cell coordinates into "first,second" labels, with None where not valid.
+    """
+    labels = numpy.full(len(valid), None, dtype=object)
+    if len(first) > 0:
+        labels[valid] = (pd.Series(first).astype(str) + "," + pd.Series(second).astype(str)).values
+    return labels
+
+
+def _millis(data):
+    """
+    Get UNIX milliseconds from datetimes (naive as UTC) or other MDS timestamp representations, NaN where missing.
+    """
+    return (TimestampDecoder().decode_many(data) - _EPOCH) // pd.Timedelta(milliseconds=1)
+
+
+def _total(results, keys):
+    """
+    Sum the partial counts of each chunk into a DataFrame.
+    """
+    if len(results) == 0:
+        return pd.DataFrame(columns=[*keys, "count"])
+
+    totals = pd.concat(results).groupby(level=list(range(len(keys)))).sum()
+    return totals.rename("count").reset_index()
@@ -434,7 +434,7 @@ class Client():
         Checks if this page has a "data" property with a non-empty payload.
         """
         data = page["data"] if "data" in page else {"__payload__": []}
-        data_key = Schema(record_type).data_key
+        data_key = Schema.get(record_type).data_key
         payload = data[data_key] if data_key in data else []
         print(f"Got payload with {len(payload)} {record_type}")
         return len(payload) > 0
@@ -7,6 +7,7 @@ import json
 import sqlalchemy
 
 from ..db import loaders
+from ..geometry import CompactGeometry
 from ..schemas import STATUS_CHANGES, TRIPS, VEHICLES
 from ..versions import Version
 
@@ -352,7 +353,7 @@ class Database():
         For each cols in the df, convert to a JSON string.
         """
         for col in [c for c in cols if c in df]:
-            df[col] = df[col].apply(json.dumps)
+            df[col] = df[col].apply(lambda v: json.dumps(v.to_geojson() if isinstance(v, CompactGeometry) else v))
         return df
 
     @staticmethod
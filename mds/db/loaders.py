@@ -268,7 +268,7 @@ class Payloads(Records):
         if isinstance(source, dict):
             source = [source]
 
-        data_key = Schema(record_type).data_key
+        data_key = Schema.get(record_type).data_key
         for payload in [p for p in source if data_key in p["data"]]:
             if version and version != Version(payload["version"]):
                 raise UnexpectedVersionError(payload["version"], version)
@@ -4,16 +4,25 @@ Encoding and decoding MDS Provider data.
 
 import json
 import datetime
+import functools
+import numbers
 import pathlib
 import uuid
 
 import dateutil.parser
+import pandas as pd
 import shapely.geometry
 
 import mds.geometry
 from .versions import Version
 
 
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+# supported serialization backends for JsonEncoder
+ENCODER_BACKENDS = [ "json", "orjson" ]
+
+
 class JsonEncoder(json.JSONEncoder):
     """
     Version-aware encoder for MDS json types:
@@ -21,6 +30,7 @@ class JsonEncoder(json.JSONEncoder):
     * datetime to date_format or str
     * Path to str
     * Point/Polygon to GeoJSON Feature dict
+    * Location/Route to GeoJSON Feature/FeatureCollection dict
     * tuple to list
     * UUID to str
     * Version to str
@@ -38,6 +48,19 @@ class JsonEncoder(json.JSONEncoder):
 
             version: str, Version, optional
                 The MDS version to target.
+
+            backend: str, optional
+                The serialization backend, one of ENCODER_BACKENDS:
+                * json: the standard library encoder (default)
+                * orjson: the native orjson encoder, serializing UUIDs itself and other special types as above.
+                  Output is compact; of the json.JSONEncoder options only indent=2 and sort_keys are supported.
+
+        Raise:
+            ImportError
+                When backend=orjson and orjson is not installed.
+
+            ValueError
+                When an unknown backend, or an option unsupported by the backend, is given.
         """
         self.version = Version(kwargs.pop("version", Version.mds_lower()))
         self.version.raise_if_unsupported()
@@ -45,8 +68,18 @@ class JsonEncoder(json.JSONEncoder):
         self.date_format = kwargs.pop("date_format", "unix")
         self.timestamp_encoder = TimestampEncoder(date_format=self.date_format, version=self.version)
 
+        self.backend = kwargs.pop("backend", "json")
+        if self.backend not in ENCODER_BACKENDS:
+            raise ValueError(f"Unknown encoder backend '{self.backend}', expected one of {ENCODER_BACKENDS}.")
+
+        # serializer for each special type seen, see _handler()
+        self._handlers = {}
+
         json.JSONEncoder.__init__(self, *args, **kwargs)
 
+        if self.backend == "orjson":
+            self._orjson, self._options = self._orjson_options()
+
     def __repr__(self):
         return f"<mds.encoding.JsonEncoder ('{self.version}', '{self.date_format}')>"
 
@@ -54,25 +87,78 @@ class JsonEncoder(json.JSONEncoder):
         """
         Implement serialization for some special types.
         """
+        handler = self._handlers.get(type(obj))
+        if handler is None:
+            handler = self._handlers[type(obj)] = self._handler(obj)
+
+        return handler(obj)
+
+    def _handler(self, obj):
+        """
+        Get the function serializing objects of the same type as obj.
+        """
         if isinstance(obj, datetime.datetime):
-            return self.timestamp_encoder.encode(obj)
+            return self.timestamp_encoder.encode
 
         if isinstance(obj, pathlib.Path):
-            return str(obj)
+            return str
 
         if isinstance(obj, shapely.geometry.Point) or isinstance(obj, shapely.geometry.Polygon):
-            return mds.geometry.to_feature(obj)
+            return mds.geometry.to_feature
+
+        if isinstance(obj, mds.geometry.CompactGeometry):
+            return type(obj).to_geojson
 
         if isinstance(obj, tuple):
-            return list(obj)
+            return list
 
         if isinstance(obj, uuid.UUID):
-            return str(obj)
+            return str
 
         if isinstance(obj, Version):
-            return str(obj)
+            return str
 
-        return json.JSONEncoder.default(self, obj)
+        return functools.partial(json.JSONEncoder.default, self)
+
+    def encode(self, o):
+        """
+        Return a JSON string representation of o.
+        """
+        if self.backend == "orjson":
+            return self._orjson.dumps(o, default=self.default, option=self._options).decode("utf-8")
+        return json.JSONEncoder.encode(self, o)
+
+    def iterencode(self, o, _one_shot=False):
+        """
+        Encode o, yielding each string representation as available.
+        """
+        if self.backend == "orjson":
+            return iter([self.encode(o)])
+        return json.JSONEncoder.iterencode(self, o, _one_shot)
+
+    def _orjson_options(self):
+        """
+        Import orjson, and get its options matching this encoder's configuration.
+        """
+        try:
+            import orjson
+        except ImportError:
+            raise ImportError("The orjson backend requires orjson, e.g. pip install mds-provider[orjson]")
+
+        if self.indent not in (None, 2):
+            raise ValueError("The orjson backend only supports indent=2.")
+
+        # datetimes use date_format, dict keys are converted to str as with json
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.indent:
+            options |= orjson.OPT_INDENT_2
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+
+        # keep any payloads written piecewise consistent with the compact output
+        self.item_separator, self.key_separator = ",", ":"
+
+        return orjson, options
 
 
 class TimestampEncoder():
@@ -121,6 +207,61 @@ class TimestampEncoder():
         except ValueError:
             return data.strftime(date_format)
 
+    def encode_many(self, data):
+        """
+        Encode many MDS timestamps at once for transport.
+
+        With date_format=unix, timezone-aware timestamps are converted to UNIX milliseconds in a single vectorized
+        operation; naive timestamps (local time, as with encode()) and other formats are encoded value by value.
+
+        Parameters:
+            data: Series, ndarray, list
+                Datetimes to encode.
+
+        Return:
+            Series
+                Of str, or None for missing values (None, NaT), with the same index as data for a Series.
+        """
+        series = data if isinstance(data, pd.Series) else pd.Series(data)
+        missing = series.isna()
+
+        if self.date_format != "unix" or len(series) == 0:
+            encoded = series.map(self._encode_value)
+        else:
+            encoded = self._encode_unix_many(series, missing)
+
+        # str Series can hold missing values as NaN
+        return encoded.astype(object).where(~missing, None)
+
+    def _encode_unix_many(self, series, missing):
+        """
+        Encode a Series of datetimes as UNIX milliseconds, vectorized where the datetimes are timezone-aware.
+        """
+        try:
+            values = pd.to_datetime(series, utc=False)
+        except (TypeError, ValueError):
+            # mixed timezones can be converted together, but naive datetimes are local time
+            if any(getattr(v, "tzinfo", None) is None for v in series[~missing]):
+                return series.map(self._encode_value)
+            values = pd.to_datetime(series, utc=True)
+
+        if values.dt.tz is None:
+            return series.map(self._encode_value)
+
+        millis = (values[~missing].dt.tz_convert("UTC") - _EPOCH) / pd.Timedelta(milliseconds=1)
+        return millis.round().astype("int64").astype(str).reindex(series.index)
+
+    def _encode_value(self, data):
+        """
+        Encode a single value from a Series, treating pandas Timestamps as the datetimes they wrap,
+        and missing values as None.
+        """
+        if data is None or data is pd.NaT:
+            return None
+        if isinstance(data, pd.Timestamp):
+            data = data.to_pydatetime()
+        return self.encode(data)
+
 
 class TimestampDecoder():
     """
@@ -145,12 +286,66 @@ class TimestampDecoder():
 
         Parameters:
             data: str, int, float
-                Data representing a datetime as text or UNIX timestamp.
+                Data representing a datetime as text or UNIX timestamp (milliseconds), including NumPy numbers.
 
         Return:
             datetime
         """
+        if isinstance(data, numbers.Real) and not isinstance(data, bool):
+            return _EPOCH + datetime.timedelta(milliseconds=float(data))
+
+        return dateutil.parser.parse(data)
+
+    def decode_many(self, data):
+        """
+        Decode many MDS timestamp representations at once into UTC datetimes, with millisecond precision.
+
+        Numeric data is converted in a single vectorized operation; only text is parsed value by value
+        where pandas can't parse it as ISO 8601.
+
+        Parameters:
+            data: Series, ndarray, list
+                Data representing datetimes as text, UNIX timestamps (milliseconds), or datetimes.
+                Missing values are decoded as NaT.
+
+        Return:
+            Series
+                Of dtype datetime64[ms, UTC], with the same index as data for a Series.
+        """
+        series = data if isinstance(data, pd.Series) else pd.Series(data)
+
+        if pd.api.types.is_datetime64_any_dtype(series):
+            result = series.dt.tz_localize("UTC") if series.dt.tz is None else series.dt.tz_convert("UTC")
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            result = pd.to_datetime(series, unit="ms", utc=True)
+        else:
+            result = self._decode_mixed(series)
+
+        return result.dt.as_unit("ms") if hasattr(result.dt, "as_unit") else result
+
+    def _decode_mixed(self, series):
+        """
+        Decode an object Series of text, numbers and datetimes.
+        """
+        result = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns, UTC]")
+
         try:
-            return datetime.datetime.fromtimestamp(int(data / 1000.0), tz=datetime.timezone.utc)
-        except:
-            return dateutil.parser.parse(data)
+            text = series.str.len().notna()
+        except AttributeError:
+            text = pd.Series(False, index=series.index)
+
+        millis = pd.to_numeric(series.where(~text), errors="coerce")
+        result[millis.notna()] = pd.to_datetime(millis[millis.notna()], unit="ms", utc=True)
+
+        others = series.notna() & ~text & millis.isna()
+        if others.any():
+            result[others] = pd.to_datetime(series[others], utc=True)
+
+        if text.any():
+            parsed = pd.to_datetime(series[text], utc=True, format="ISO8601", errors="coerce")
+            unparsed = parsed.isna()
+            if unparsed.any():
+                parsed[unparsed] = pd.to_datetime(series[text][unparsed].map(dateutil.parser.parse), utc=True)
+            result[text] = parsed
+
+        return result
@@ -49,10 +49,17 @@ class ProviderDataGenerator():
 
             version: str, Version, optional
                 The MDS version to target. By default, use Version.mds_lower().
+
+            compact_geometry: bool, optional
+                True to generate locations and routes as compact mds.geometry.Location and Route objects,
+                which DataValidator and JsonEncoder read as GeoJSON.
+                False (default) to generate GeoJSON dicts.
         """
         self.version = Version(kwargs.pop("version", Version.mds_lower()))
         self.version.raise_if_unsupported()
 
+        self.compact_geometry = kwargs.get("compact_geometry", False)
+
         self.boundary = mds.geometry.parse_boundary(boundary)
         self.trips_schema = Schema.trips(self.version)
         self.status_schema = Schema.status_changes(self.version)
@@ -287,7 +294,7 @@ class ProviderDataGenerator():
             # somewhere in the previous :offset:
             event_time = util.random_date_from(start_time, min_td=offset)
             point = geometry.point_within(self.boundary)
-            feature = mds.geometry.to_feature(point, properties=dict(timestamp=event_time))
+            feature = self.location(point, event_time)
 
             # the status_change details
             service_start = self.status_change_event(device,
@@ -341,7 +348,7 @@ class ProviderDataGenerator():
                 point = mds.geometry.extract_point(locations[devices.index(device)])
 
             # the status_change details
-            feature = mds.geometry.to_feature(point, properties=dict(timestamp=event_time))
+            feature = self.location(point, event_time)
             service_end = self.status_change_event(device,
                                                    event_type="removed",
                                                    event_type_reason="service_end",
@@ -395,7 +402,7 @@ class ProviderDataGenerator():
 
         if event_location is None:
             point = geometry.point_within(self.boundary)
-            event_location = mds.geometry.to_feature(point, properties=dict(timestamp=event_time))
+            event_location = self.location(point, event_time)
 
         if speed is None:
             speed = self.speed
@@ -434,7 +441,7 @@ class ProviderDataGenerator():
         if end_location is None:
             start_point = mds.geometry.extract_point(event_location)
             end_point = geometry.point_nearby(start_point, trip_distance, boundary=self.boundary)
-            end_location = mds.geometry.to_feature(end_point, properties=dict(timestamp=end_time))
+            end_location = self.location(end_point, end_time)
 
         # generate the route object
         route = self.trip_route(event_location, end_location)
@@ -531,8 +538,29 @@ class ProviderDataGenerator():
                 A GeoJSON FeatureCollection of the start and end locations.
         """
         features = [start_location, end_location]
+        if self.compact_geometry:
+            return mds.geometry.Route.from_features(features)
         return dict(type="FeatureCollection", features=features)
 
+    def location(self, point, timestamp):
+        """
+        Create a GeoJSON Feature for a point in time.
+
+        Parameters:
+            point: shapely.geometry.Point
+                The location.
+
+            timestamp: datetime
+                The time at the location.
+
+        Returns:
+            dict, mds.geometry.Location
+                A GeoJSON Feature, or with compact_geometry=True its compact Location.
+        """
+        if self.compact_geometry:
+            return mds.geometry.Location.from_point(point, dict(timestamp=timestamp))
+        return mds.geometry.to_feature(point, properties=dict(timestamp=timestamp))
+
     def end_trip(self, device, event_time, event_location, **kwargs):
         """
         Create an available:user_drop_off status_change event.
@@ -622,7 +650,7 @@ class ProviderDataGenerator():
             if event_locations is None:
                 # random point
                 point = geometry.point_within(self.boundary)
-                event_location = mds.geometry.to_feature(point, properties=dict(timestamp=event_time))
+                event_location = self.location(point, event_time)
             elif len(event_locations) == len(devices):
                 # corresponding location
                 event_location = event_locations[devices.index(device)]
@@ -697,7 +725,7 @@ class ProviderDataGenerator():
 
         if event_location is None:
             point = geometry.point_within(self.boundary)
-            event_location = mds.geometry.to_feature(point, properties=dict(timestamp=event_time))
+            event_location = self.location(point, event_time)
 
         status_change = dict(event_type=event_type,
                              event_type_reason=event_type_reason,
@@ -749,7 +777,7 @@ class ProviderDataGenerator():
 
         if event_location is None:
             point = geometry.point_within(self.boundary)
-            event_location = mds.geometry.to_feature(point, properties=dict(timestamp=event_time))
+            event_location = self.location(point, event_time)
 
         last_status = dict(last_event_time=event_time,
                            last_event_type=event_type,
@@ -785,15 +813,13 @@ class ProviderDataGenerator():
         etrs = self.status_schema.event_type_reasons
 
         if event_type is None and event_type_reason:
-            # invert the {event_type:[event_type_reason]} dict into {event_type_reason:event_type}
-            reason_types = dict([(v,k) for k,reason_list in etrs.items() for v in reason_list])
-            event_type = reason_types[event_type_reason]
+            event_type = self.status_schema.reason_event_types[event_type_reason]
         elif event_type and event_type_reason is None:
             # pick a random reason for this event_type
             event_type_reason = random.choice(etrs[event_type])
         else:
             # pick a random event_type and corresponding reason
-            event_type = random.choice(list(etrs.keys()))
+            event_type = random.choice(self.status_schema.event_types)
             event_type_reason = random.choice(etrs[event_type])
 
         return (event_type, event_type_reason)
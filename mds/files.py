@@ -2,21 +2,89 @@
 Work with MDS Provider data in JSON files.
 """
 
+import collections
+import concurrent.futures
+import contextlib
 import datetime
+import fnmatch
+import functools
+import gzip
 import hashlib
+import io
+import itertools
 import json
+import mmap
+import numbers
+import os
 import pathlib
+import re
+import shutil
+import sqlite3
+import stat
+import threading
 import urllib
+import uuid
 
 import requests
 import pandas as pd
 
+import mds.geometry
 from .encoding import JsonEncoder, TimestampDecoder, TimestampEncoder
 from .providers import Provider
 from .schemas import SCHEMA_TYPES, STATUS_CHANGES, TRIPS, EVENTS, VEHICLES, Schema
 from .versions import UnexpectedVersionError, Version
 
 
+# record fields holding GeoJSON data
+_GEOMETRY_FIELDS = ["event_location", "route", "last_event_location", "current_location"]
+
+# record fields holding MDS timestamps
+_TIME_FIELDS = ["event_time", "publication_time", "start_time", "end_time", "last_event_time", "last_updated"]
+
+# file name suffix for each supported compression
+_COMPRESSION_SUFFIXES = { "gzip": ".gz", "zstd": ".zst" }
+
+# leading bytes of data compressed by each supported compression
+_COMPRESSION_MAGIC = { "gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd" }
+
+# default name of the database file for an IndexFile in a directory
+INDEX_FILE_NAME = "mds_index.sqlite"
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    record_type TEXT,
+    versions TEXT,
+    start_time INTEGER,
+    end_time INTEGER,
+    record_count INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS file_providers (
+    path TEXT,
+    provider_name TEXT,
+    PRIMARY KEY (path, provider_name)
+);
+CREATE INDEX IF NOT EXISTS files_time ON files (record_type, start_time, end_time);
+CREATE INDEX IF NOT EXISTS file_providers_name ON file_providers (provider_name);
+"""
+
+# default patterns of files to read from directories
+_LS_INCLUDE = [f"*{ext}{suffix}" for ext in (".json", ".ndjson") for suffix in ("", *_COMPRESSION_SUFFIXES.values())]
+
+# names of date-partitioned directories: a whole date, or nested year, month and day directories
+_DATE_PARTITION = re.compile(r"(?:date=)?(\d{4})-(\d{2})-(\d{2})")
+_DATE_PARTITION_PARTS = [re.compile(r"(?:year=)?(\d{4})"), re.compile(r"(?:month=)?(\d{1,2})"),
+                         re.compile(r"(?:day=)?(\d{1,2})")]
+
+# the most directory listings to keep cached, see DataFile._scandir()
+_LISTINGS_MAXSIZE = 4096
+
+# default partitioning for Parquet datasets
+_PARQUET_PARTITIONS = ["record_type", "provider_name", "date"]
+
+
 class BaseFile():
     """
     Base class for working with Provider files.
@@ -50,16 +118,16 @@ class BaseFile():
         """
         Return True if source is a valid directory that exists.
         """
-        path = pathlib.Path(source.path)
-        return not cls._isfile(source) and path.is_dir() and path.exists()
+        st = cls._stat(source)
+        return st is not None and stat.S_ISDIR(st.st_mode)
 
     @classmethod
     def _isfile(cls, source):
         """
         Return True if path is a valid file that exists.
         """
-        path = pathlib.Path(source.path)
-        return not cls._isurl(source) and path.is_file() and path.exists()
+        st = cls._stat(source)
+        return st is not None and stat.S_ISREG(st.st_mode)
 
     @classmethod
     def _isurl(cls, source):
@@ -75,6 +143,18 @@ class BaseFile():
         """
         return urllib.parse.urlparse(str(source)) if source else None
 
+    @classmethod
+    def _stat(cls, source):
+        """
+        Get the os.stat_result of a local source path, or None for URLs and paths that don't exist.
+        """
+        if cls._isurl(source):
+            return None
+        try:
+            return os.stat(source.path)
+        except (OSError, ValueError):
+            return None
+
 
 class ConfigFile(BaseFile):
     """
@@ -182,6 +262,10 @@ class DataFile(BaseFile):
     Work with Provider payload data in JSON files.
     """
 
+    # cached directory listings, least recently used first, keyed by path
+    _listings = collections.OrderedDict()
+    _listings_lock = threading.Lock()
+
     def __init__(self, record_type=None, *sources, **kwargs):
         """
         Parameters:
@@ -192,14 +276,18 @@ class DataFile(BaseFile):
                 One or more paths to (directories containing) MDS payload (JSON) files to read by default.
                 Directories are expanded such that all corresponding files within are read.
 
-            file_name: str, callable(record_type=str, payloads=list, extension=str, [payload=dict]): str, optional
+            file_name: str, callable(record_type=str, payloads=list, extension=str, **kwargs): str, optional
                 A str name for the file; or a function receiving record_type, list of payloads,
-                file extension, and optionally a single payload being written, and returns the str
-                name for the file.
+                file extension, optionally a single payload being written (payload=dict), and a summary
+                of the payloads written (summary=dict), and returns the str name for the file.
 
             ls: callable(sources=list): list, optional
                 A function that receives a list of urllib.parse.ParseResult, and returns the
                 complete list of file Path objects and URL str to be read.
+
+            index: bool, str, Path, IndexFile, optional
+                An index of payload files to maintain when dumping, and to query when loading.
+                True to use an index in the directory being written or read.
         """
         super().__init__(*sources, **kwargs)
 
@@ -218,6 +306,7 @@ class DataFile(BaseFile):
             self.file_name = file_name
 
         self.ls = kwargs.get("ls", self._ls)
+        self.index = kwargs.get("index")
 
     def __repr__(self):
         return "".join((
@@ -243,10 +332,106 @@ class DataFile(BaseFile):
             return record_type
         raise ValueError(f"A valid record type must be specified. Got {record_type}")
 
+    def dump_parquet(self, record_type=None, *payloads, **kwargs):
+        """
+        Write the records from MDS Provider payloads to a partitioned Parquet dataset.
+
+        Requires pyarrow.
+
+        Parameters:
+            record_type: str, optional
+                The type of MDS Provider record.
+
+            payloads: dict, iterable
+                One or more MDS Provider payload dicts to write.
+
+            output_dir: str, Path, optional
+                The root directory of the dataset.
+                If this instance was initialized with a single directory source, use that by default.
+                Otherwise, use the current directory by default.
+
+            partition_cols: list, optional
+                The columns used to partition the dataset into a directory hierarchy.
+                By default, partition by record_type, provider_name and date (of the record's time field).
+
+            Additional keyword arguments are passed through to pyarrow.parquet.write_to_dataset().
+
+        Raise:
+            UnexpectedVersionError
+                When a version mismatch is found amongst the payloads.
+
+            ValueError
+                When neither record_type or instance.record_type is specified.
+
+        Return:
+            Path
+                The Path object pointing to the root directory of the dataset.
+                None if no records were written.
+        """
+        pa, pq, _ = self._pyarrow_or_raise()
+
+        if record_type and record_type not in SCHEMA_TYPES:
+            payloads = (record_type, *payloads)
+            record_type = None
+
+        record_type = self._record_type_or_raise(record_type)
+        data_key = Schema.get(record_type).data_key
+
+        # convert payloads to a flat list of dicts
+        pages = []
+        for payload in payloads:
+            if isinstance(payload, dict):
+                pages.append(payload)
+            else:
+                pages.extend(payload)
+
+        pages = [p for p in pages if data_key in p["data"]]
+        records = [r for p in pages for r in self._records(p, record_type, data_key)]
+
+        if len(records) == 0:
+            return None
+
+        version = Version(pages[0]["version"])
+        unexpected = next((Version(p["version"]) for p in pages if Version(p["version"]) != version), None)
+        if unexpected:
+            raise UnexpectedVersionError(unexpected, version)
+
+        df = pd.DataFrame.from_records(records)
+        encoder = JsonEncoder(date_format="unix", version=version)
+
+        # GeoJSON is stored as text, everything else non-native as str
+        for col in df.columns:
+            if col in _GEOMETRY_FIELDS:
+                df[col] = df[col].apply(lambda v: None if v is None else encoder.encode(v))
+            elif col in _TIME_FIELDS:
+                df[col] = self._parquet_timestamps(df[col])
+            elif df[col].dtype == object:
+                df[col] = df[col].apply(lambda v: str(v) if isinstance(v, uuid.UUID) else v)
+
+        df["record_type"] = record_type
+        df["date"] = df[self._time_key(record_type)].dt.strftime("%Y-%m-%d")
+
+        output_dir = pathlib.Path(kwargs.pop("output_dir", self._default_dir()))
+        partition_cols = kwargs.pop("partition_cols", _PARQUET_PARTITIONS)
+
+        # keep the MDS version with the data
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = { **(table.schema.metadata or {}), b"mds_version": str(version).encode() }
+        table = table.replace_schema_metadata(metadata)
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_to_dataset(table, str(output_dir), partition_cols=partition_cols, **kwargs)
+
+        return output_dir
+
     def dump_payloads(self, record_type=None, *payloads, **kwargs):
         """
         Write MDS Provider payloads to JSON files.
 
+        Payloads are encoded and written incrementally, so a generator of payloads (e.g. pages straight from a
+        Client) is never held in memory all at once. Each file is written under a temporary name and renamed
+        once complete, so a failed dump never leaves a partial file behind.
+
         Parameters:
             record_type: str, optional
                 The type of MDS Provider record.
@@ -259,15 +444,44 @@ class DataFile(BaseFile):
                 If this instance was initialized with a single directory source, use that by default.
                 Otherwise, use the current directory by default.
 
-            file_name: str, callable(record_type=str, payloads=list, extension=str, [payload=dict]): str, optional
+            file_name: str, callable(record_type=str, payloads=list, extension=str, **kwargs): str, optional
                 A str name for the file; or a function receiving record_type, list of payloads,
-                file extension, and optionally a single payload being written, and returns the str
-                name for the file.
+                file extension, optionally a single payload being written (payload=dict), and a summary
+                of the payloads written (summary=dict), and returns the str name for the file.
+                When writing a single file from a generator of payloads, the list of payloads is empty.
+                When writing each payload to its own file, the list holds just that payload.
 
             single_file: bool, optional
                 True (default) to write the payloads to a single file using the appropriate data structure.
                 False to write each payload as a dict to its own file.
 
+            parallel: bool, int, optional
+                With single_file=False, True to encode and write files with a pool of threads; or an int
+                for the number of concurrent workers. False (default) to write each file in turn.
+
+            compression: str, optional
+                Compress the files as they are written, using one of:
+                * gzip: write .json.gz files
+                * zstd: write .json.zst files (requires zstandard)
+                By default, files are compressed according to the suffix of the file name, if any.
+                A ValueError is raised when the suffix of the file name contradicts the compression.
+
+            ndjson: bool, optional
+                True to write newline-delimited JSON (.ndjson) files: for each payload, a header line
+                with the payload's version and metadata, followed by a line for each of its records.
+                False (default) to write JSON files.
+
+            append: bool, optional
+                With ndjson=True, True to append to an existing file rather than overwrite it.
+                A ValueError is raised when appending without ndjson=True.
+
+            index: bool, str, Path, IndexFile, optional
+                An index to update with each file written.
+                True to use an index in output_dir. By default, use this instance's index, if any.
+
+            backend: str, optional
+                The JsonEncoder serialization backend, e.g. orjson. See JsonEncoder.
+
             Additional keyword arguments are passed through to json.dump().
 
         Return:
@@ -289,75 +503,274 @@ class DataFile(BaseFile):
                 sources.extend(record_type)
             elif isinstance(record_type, tuple):
                 sources.extend(list(record_type))
+            elif not isinstance(record_type, str) and len(payloads) == 0:
+                payloads = (record_type,)
             record_type = None
 
         record_type = record_type or self.record_type
 
-        # convert payloads to a flat list of dicts
+        # convert payloads to a flat list of dicts, or a stream of dicts for anything not already in memory
         if isinstance(payloads, tuple) and len(payloads) == 1:
             payloads = payloads[0]
         if isinstance(payloads, dict):
             payloads = [payloads]
             dict_source = True
-        if not isinstance(payloads, list):
-            payloads = list(payloads)
 
-        sources.extend(payloads)
+        if isinstance(payloads, (list, tuple)):
+            sources.extend(payloads)
+        else:
+            sources = itertools.chain(sources, payloads)
 
         # filter payloads with non-matching record_type
         if record_type in SCHEMA_TYPES:
-            data_key = Schema(record_type).data_key
-            sources = [p for p in sources if data_key in p["data"]]
+            data_key = Schema.get(record_type).data_key
+            sources = (p for p in sources if data_key in p["data"])
+            sources = list(sources) if isinstance(payloads, (list, tuple)) else sources
 
-        if len(sources) == 0:
+        # peek at the stream for the first payload
+        if isinstance(sources, list):
+            first = sources[0] if len(sources) > 0 else None
+        else:
+            first = next(sources, None)
+            sources = itertools.chain([first], sources)
+
+        if first is None:
             return None
 
         output_dir = pathlib.Path(kwargs.pop("output_dir", self._default_dir()))
         single_file = kwargs.pop("single_file", True)
+        parallel = kwargs.pop("parallel", False)
+        compression = kwargs.pop("compression", None)
+
+        ndjson = kwargs.pop("ndjson", False)
+        append = kwargs.pop("append", False)
+        if append and not ndjson:
+            raise ValueError("Appending to files requires ndjson=True.")
+        base_extension = ".ndjson" if ndjson else ".json"
+        extension = base_extension + self._compression_suffix(compression)
+
+        # one line per header or record
+        if ndjson:
+            kwargs["indent"] = None
 
         file_name = kwargs.pop("file_name", self.file_name)
         if isinstance(file_name, str):
             orig_file_name = file_name
             file_name = lambda **kwargs: orig_file_name
+            compression = self._compression_or_raise(orig_file_name, compression)
 
         output_dir.mkdir(parents=True, exist_ok=True)
 
+        index = self._index_or_none(kwargs.pop("index", self.index), output_dir)
+
         if single_file:
-            version = sources[0]["version"]
-            encoder = JsonEncoder(date_format="unix", version=version, **kwargs)
+            encoder = JsonEncoder(date_format="unix", version=first["version"], **kwargs)
 
-            # generate a file name for the list of payloads
-            fname = file_name(record_type=record_type, payloads=sources, extension=".json")
-            path = pathlib.Path(output_dir, fname)
+            # payloads in memory are named up front, a stream is named once it has been written
+            path = None
+            if isinstance(sources, list):
+                fname = file_name(record_type=record_type, payloads=sources, extension=extension)
+                path = pathlib.Path(output_dir, fname)
+                compression = self._compression_or_raise(path, compression)
 
-            # dump the single payload or a list of payloads
-            if dict_source and len(sources) == 1:
-                path.write_text(encoder.encode(sources[0]))
-            else:
-                path.write_text(encoder.encode(sources))
+            with self._tempfile(output_dir) as temp:
+                with self._open(temp, "w", compression=compression) as f:
+                    # dump the single payload or a list of payloads
+                    single = dict_source and isinstance(sources, list) and len(sources) == 1
+                    summary = self._write_payloads(f, sources, encoder, record_type, ndjson, single)
+
+                if path is None:
+                    fname = file_name(record_type=record_type, payloads=[], extension=extension, summary=summary)
+                    path = pathlib.Path(output_dir, fname)
+                    self._compression_or_raise(path, compression)
+
+                self._replace(temp, path, append)
+
+            if index:
+                index.add(path, summary, append)
 
             return path
 
-        # multi-file
-        for payload in sources:
-            version = payload["version"]
-            encoder = JsonEncoder(date_format="unix", version=version, **kwargs)
-
-            # generate a file name for this payload
-            fname = file_name(record_type=record_type, payloads=sources, extension=".json", payload=payload)
-            path = pathlib.Path(output_dir, fname)
-            if sources.index(payload) > 0 and path.exists():
-                # increment the file number
-                n = str(sources.index(payload))
-                # pad with number of zeros based on how many items in the list
-                nz = len(str(len(sources)))
-                path = pathlib.Path(str(path).replace(".json", f"_{n.zfill(nz)}.json"))
+        # multi-file, in a single pass naming each payload from its own data
+        count = len(sources) if isinstance(sources, list) else None
+        width = len(str(count)) if count else 0
+        paths = set()
+        encoders = {}
+
+        def dump(payload, path, summary):
+            version = str(payload["version"])
+            if version not in encoders:
+                encoders[version] = JsonEncoder(date_format="unix", version=version, **kwargs)
 
             # dump the payload dict
-            path.write_text(encoder.encode(payload))
+            with self._tempfile(output_dir) as temp:
+                with self._open(temp, "w", compression=compression or self._compression(path)) as f:
+                    self._write_payloads(f, [payload], encoders[version], record_type, ndjson, single=True)
+                self._replace(temp, path, append)
+
+            if index:
+                index.add(path, summary, append)
+
+        workers = (os.cpu_count() or 1) if parallel is True else int(parallel or 1)
+        pending = set()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            for i, payload in enumerate(sources):
+                # generate a file name for this payload
+                summary = self._summarize([payload], record_type)
+                fname = file_name(record_type=record_type, payloads=[payload], extension=extension, payload=payload,
+                                  summary=summary)
+                path = pathlib.Path(output_dir, fname)
+                self._compression_or_raise(path, compression)
+
+                # don't overwrite files written earlier, in this or a previous dump (unless appending to them)
+                numbered, n = path, max(i, 1)
+                while numbered in paths or (not append and numbered.exists()):
+                    # increment the file number, padded with zeros based on how many payloads there are
+                    suffix = f"_{str(n).zfill(width)}{base_extension}"
+                    numbered = pathlib.Path(str(path).replace(base_extension, suffix))
+                    n += 1
+                path = numbered
+                paths.add(path)
+
+                if not parallel:
+                    dump(payload, path, summary)
+                    continue
+
+                # limit the number of payloads waiting to be written
+                pending.add(pool.submit(dump, payload, path, summary))
+                if len(pending) >= workers * 2:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+
+            for future in pending:
+                future.result()
 
         return output_dir
 
+    def iter_records(self, record_type=None, *sources, **kwargs):
+        """
+        Lazily reads the contents of MDS payload files, yielding records as each file and page is read.
+
+        Parameters:
+            record_type: str, optional
+                The type of MDS Provider record.
+
+            sources: str, Path, list, optional
+                One or more paths to (directories containing) MDS payload (JSON) files.
+                Directories are expanded such that all corresponding files within are read.
+                URLs pointing to JSON files are also supported.
+
+            batch: bool, optional
+                True to yield a (Version, list) tuple for each page of records.
+                False (default) to yield a (Version, dict) tuple for each record.
+
+            version: str, Version, optional
+                The MDS version expected of every page. By default, the version of the first page read.
+
+            strict: bool, optional
+                True (default) to raise an error when a page with an unexpected version is read.
+                False to yield records of any version.
+
+            headers: dict, optional
+                A dict of headers to send with requests made to URL paths.
+                Could also be a dict mapping an URL path to headers for that path.
+
+            ls: callable(sources=list, **kwargs): tuple (files: list, urls: list), optional
+                A function that receives a list of urllib.parse.ParseResult, and returns
+                a tuple of a list of valid files, and a list of valid URLs to be read from.
+                Also receives any recursive, include, exclude, start_time and end_time given.
+
+            recursive: bool, optional
+                True to read files from directories recursively. See DataFile._ls().
+
+            include: str, list, optional
+                Glob patterns of files to read from directories. See DataFile._ls().
+
+            exclude: str, list, optional
+                Glob patterns of files and directories to skip within directories. See DataFile._ls().
+
+            index: bool, str, Path, IndexFile, optional
+                An index of payload files, used to skip reading indexed files that don't match the
+                record_type, providers, start_time and end_time. Files missing from the index are always read.
+                True to use an index in the (single) directory being read.
+                By default, use this instance's index, if any.
+
+            providers: str, list, optional
+                With index, only read files with records from the given provider_name(s).
+
+            start_time: datetime, int, optional
+                Only read indexed files, and files within date-partitioned directories,
+                with records at or after the given time.
+
+            end_time: datetime, int, optional
+                Only read indexed files, and files within date-partitioned directories,
+                with records before the given time.
+
+            parallel: bool, int, optional
+                See load_payloads().
+
+            processes: bool, optional
+                See load_payloads().
+
+            Additional keyword arguments are passed through to json.loads().
+
+        Raise:
+            UnexpectedVersionError
+                When strict=True and a page with an unexpected version is read.
+
+            ValueError
+                When neither record_type or instance.record_type is specified.
+                When providers are given without an index, or start_time or end_time are given without an index
+                and outside of date-partitioned directories.
+
+        Return:
+            iterator
+                Of (Version, dict) tuples; or with batch=True, of (Version, list) tuples.
+        """
+        record_type = self._record_type_or_raise(record_type)
+        record_type, sources = self._sources_or_raise(record_type, sources)
+        data_key = Schema.get(record_type).data_key
+
+        batch = kwargs.pop("batch", False)
+        strict = kwargs.pop("strict", True)
+        version = kwargs.pop("version", None)
+        version = Version(version) if version else None
+
+        headers = kwargs.pop("headers", {})
+        parallel = kwargs.pop("parallel", False)
+        processes = kwargs.pop("processes", False)
+
+        ls = kwargs.pop("ls", self.ls)
+        files, urls = ls(sources, **self._ls_options(kwargs))
+        files = self._find(files, record_type, sources, kwargs)
+
+        # NDJSON files are read lazily, a page at a time, unless handed off to another process
+        kwargs["lazy"] = not processes
+
+        for payload in self._read(files, urls, headers, parallel, processes, **kwargs):
+            if isinstance(payload, dict):
+                payload = [payload]
+
+            for page in payload:
+                if "data" not in page or data_key not in page["data"]:
+                    continue
+
+                page_version = Version(page["version"])
+                version = version or page_version
+
+                if strict and page_version != version:
+                    raise UnexpectedVersionError(page_version, version)
+
+                records = self._records(page, record_type, data_key)
+
+                if batch:
+                    yield page_version, records
+                else:
+                    for record in records:
+                        yield page_version, record
+
     def load_dataframe(self, record_type=None, *sources, **kwargs):
         """
         Reads the contents of MDS payload files into tuples of (Version, DataFrame).
@@ -382,6 +795,10 @@ class DataFile(BaseFile):
                 A function that receives a list of urllib.parse.ParseResult, and returns the
                 complete list of file Path objects and URL str to be read.
 
+            compact_geometry: bool, optional
+                True to hold point geometry (e.g. event_location, route) as compact Location and Route objects.
+                False (default) to keep the GeoJSON dicts. See mds.geometry.compact().
+
         Raise:
             UnexpectedVersionError
                 When flatten=True and a version mismatch is found amongst the data.
@@ -399,6 +816,7 @@ class DataFile(BaseFile):
         """
         record_type = self._record_type_or_raise(record_type)
         flatten = kwargs.pop("flatten", True)
+        compact_geometry = kwargs.pop("compact_geometry", False)
 
         # obtain unmodified records
         kwargs["flatten"] = False
@@ -409,16 +827,131 @@ class DataFile(BaseFile):
 
         version = Version(records[0][0])
 
+        def dataframe(records):
+            df = pd.DataFrame.from_records(records)
+            if compact_geometry:
+                for col in [c for c in _GEOMETRY_FIELDS if c in df]:
+                    df[col] = df[col].map(mds.geometry.compact)
+            return df
+
         if flatten:
             if not all([Version(v) == version for v,_ in records]):
                 unexpected = [Version(v) for v,_ in records if Version(v) != version][0]
                 raise UnexpectedVersionError(unexpected, version)
             # combine each record list
             records = [item for _,data in records for item in data]
-            return version, pd.DataFrame.from_records(records)
+            return version, dataframe(records)
         else:
             # list of version, DataFrame tuples
-            return [(Version(r[0]), pd.DataFrame.from_records(r[1])) for r in records]
+            return [(Version(r[0]), dataframe(r[1])) for r in records]
+
+    def load_parquet(self, record_type=None, *sources, **kwargs):
+        """
+        Reads MDS records from Parquet datasets written by dump_parquet() into a tuple of (Version, DataFrame).
+
+        Only the requested columns, and the partitions and row groups overlapping the requested time range
+        and providers are read.
+
+        Requires pyarrow.
+
+        Parameters:
+            record_type: str, optional
+                The type of MDS Provider record.
+
+            sources: str, Path, list, optional
+                One or more paths to Parquet dataset root directories or files.
+
+            columns: list, optional
+                The record fields to read. By default, read all fields.
+
+            start_time: datetime, int, optional
+                Only read records with a time field at or after the given time.
+                Should be a datetime or int UNIX milliseconds.
+
+            end_time: datetime, int, optional
+                Only read records with a time field before the given time.
+                Should be a datetime or int UNIX milliseconds.
+
+            providers: str, list, optional
+                Only read records for the given provider_name(s).
+
+            decode_geometry: bool, optional
+                True (default) to parse GeoJSON fields back into dicts.
+                False to keep them as JSON text.
+
+        Raise:
+            UnexpectedVersionError
+                When a version mismatch is found amongst the datasets.
+
+            ValueError
+                When neither record_type or instance.record_type is specified.
+
+        Return:
+            tuple (Version, DataFrame)
+                The version of the data, and a DataFrame of the matching records.
+        """
+        _, _, ds = self._pyarrow_or_raise()
+
+        # record_type is not a schema type, but a data source
+        if record_type and record_type not in SCHEMA_TYPES:
+            sources = (record_type, *sources)
+            record_type = None
+
+        record_type = self._record_type_or_raise(record_type)
+
+        sources = [self._parse(s) for s in sources] or self._sources
+        paths = [s.path for s in sources if self._isdir(s) or self._isfile(s)]
+
+        if len(paths) == 0:
+            raise IndexError("There are no sources to read from.")
+
+        datasets = [ds.dataset(p, format="parquet", partitioning="hive") for p in paths]
+        dataset = datasets[0] if len(datasets) == 1 else ds.dataset(datasets)
+
+        # build the partition and row group filter, skipping fields the dataset doesn't know about
+        fields = dataset.schema.names
+        time_key = self._time_key(record_type)
+        filters = ds.scalar(True)
+
+        if "record_type" in fields:
+            filters = filters & (ds.field("record_type") == record_type)
+
+        providers = kwargs.get("providers")
+        if providers:
+            providers = [providers] if isinstance(providers, str) else list(providers)
+            filters = filters & ds.field("provider_name").isin(providers)
+
+        start_time, end_time = kwargs.get("start_time"), kwargs.get("end_time")
+        if start_time is not None:
+            start_time = self._parquet_timestamps(pd.Series([start_time]))[0].to_pydatetime()
+            filters = filters & (ds.field(time_key) >= start_time)
+            if "date" in fields:
+                filters = filters & (ds.field("date") >= start_time.strftime("%Y-%m-%d"))
+        if end_time is not None:
+            end_time = self._parquet_timestamps(pd.Series([end_time]))[0].to_pydatetime()
+            filters = filters & (ds.field(time_key) < end_time)
+            if "date" in fields:
+                filters = filters & (ds.field("date") <= end_time.strftime("%Y-%m-%d"))
+
+        # only the fragments matching the filter contribute data, so only those need a matching version
+        fragments = list(dataset.get_fragments(filter=filters))
+        versions = [(f.physical_schema.metadata or {}).get(b"mds_version") for f in fragments]
+        versions = [Version(v.decode()) for v in versions if v]
+
+        version = versions[0] if len(versions) > 0 else None
+        unexpected = next((v for v in versions if v != version), None)
+        if unexpected:
+            raise UnexpectedVersionError(unexpected, version)
+
+        columns = kwargs.get("columns")
+        df = dataset.to_table(columns=columns, filter=filters).to_pandas()
+        df = df.drop(columns=[c for c in ["record_type", "date"] if c in df and c not in (columns or [])])
+
+        if kwargs.get("decode_geometry", True):
+            for col in [c for c in _GEOMETRY_FIELDS if c in df]:
+                df[col] = df[col].apply(lambda v: None if v is None else json.loads(v))
+
+        return version, df
 
     def load_payloads(self, record_type=None, *sources, **kwargs):
         """
@@ -433,6 +966,7 @@ class DataFile(BaseFile):
                 One or more paths to (directories containing) MDS payload (JSON) files.
                 Directories are expanded such that all corresponding files within are read.
                 URLs pointing to JSON files are also supported.
+                Newline-delimited JSON (.ndjson) files written by dump_payloads() are read as a list of payloads.
 
             flatten: bool, optional
                 True (default) to flatten the final result from all sources into a list of dicts.
@@ -442,52 +976,82 @@ class DataFile(BaseFile):
                 A dict of headers to send with requests made to URL paths.
                 Could also be a dict mapping an URL path to headers for that path.
 
-            ls: callable(sources=list): tuple (files: list, urls: list), optional
+            ls: callable(sources=list, **kwargs): tuple (files: list, urls: list), optional
                 A function that receives a list of urllib.parse.ParseResult, and returns
                 a tuple of a list of valid files, and a list of valid URLs to be read from.
+                Also receives any recursive, include, exclude, start_time and end_time given.
+
+            recursive: bool, optional
+                True to read files from directories recursively. See DataFile._ls().
+
+            include: str, list, optional
+                Glob patterns of files to read from directories. See DataFile._ls().
+
+            exclude: str, list, optional
+                Glob patterns of files and directories to skip within directories. See DataFile._ls().
+
+            index: bool, str, Path, IndexFile, optional
+                An index of payload files, used to skip reading indexed files that don't match the
+                record_type, providers, start_time and end_time. Files missing from the index are always read.
+                True to use an index in the (single) directory being read.
+                By default, use this instance's index, if any.
+
+            providers: str, list, optional
+                With index, only read files with records from the given provider_name(s).
+
+            start_time: datetime, int, optional
+                Only read indexed files, and files within date-partitioned directories,
+                with records at or after the given time.
 
-            Additional keyword arguments are passed through to json.load().
+            end_time: datetime, int, optional
+                Only read indexed files, and files within date-partitioned directories,
+                with records before the given time.
+
+            parallel: bool, int, optional
+                True to read files and URLs concurrently with a pool of threads; or
+                an int for the number of concurrent workers.
+                False (default) to read each source one after another.
+                Either way, results are in the same order as the sources.
+
+            processes: bool, optional
+                With parallel, True to read and decode files in a pool of processes instead of threads,
+                for large amounts of CPU-bound JSON decoding. URLs are always requested with threads.
+                Any additional keyword arguments must be picklable.
+
+            Additional keyword arguments are passed through to json.loads().
 
         Raise:
             IndexError
                 When no sources have been specified.
 
+            ValueError
+                When providers are given without an index, or start_time or end_time are given without an index
+                and outside of date-partitioned directories.
+
         Return:
             list
                 With a single file source, or multiple sources and flatten=True, a list of Provider payload dicts.
                 With multiple sources and flatten=False, a list of the raw contents of each file.
         """
-        sources = [self._parse(s) for s in sources]
-
-        # record_type is not a schema type, but a data source
-        if record_type and record_type not in SCHEMA_TYPES:
-            sources.append(self._parse(record_type))
-            record_type = None
-
-        if len(sources) == 0:
-            sources.extend(self._sources)
-
-        if len(sources) == 0:
-            raise IndexError("There are no sources to read from.")
-
-        record_type = record_type or self.record_type
+        record_type, sources = self._sources_or_raise(record_type, sources)
 
         flatten = kwargs.pop("flatten", True)
         headers = kwargs.pop("headers", {})
+        parallel = kwargs.pop("parallel", False)
+        processes = kwargs.pop("processes", False)
 
         # obtain a list of file Paths and URL str to read
         ls = kwargs.pop("ls", self.ls)
-        files, urls = ls(sources)
+        files, urls = ls(sources, **self._ls_options(kwargs))
+        files = self._find(files, record_type, sources, kwargs)
 
         # load from each file/URL pointer into a composite list
-        data = []
-        data.extend([json.loads(f.read_text(), **kwargs) for f in files])
-        data.extend([requests.get(u, headers=headers.get(u, headers)).json() for u in urls])
+        data = list(self._read(files, urls, headers, parallel, processes, **kwargs))
 
         # filter out payloads with non-matching record_type
         if record_type:
             filtered = []
-            data_key = Schema(record_type).data_key
+            data_key = Schema.get(record_type).data_key
             for payload in data:
                 if isinstance(payload, list):
                     filtered.extend(filter(lambda p: data_key in p["data"], payload))
@@ -549,49 +1113,18 @@ class DataFile(BaseFile):
 
         flatten = kwargs.pop("flatten", True)
 
-        # obtain unmodified payloads
-        kwargs["flatten"] = False
-        payloads = self.load_payloads(record_type, *sources, **kwargs)
-
-        if len(payloads) < 1:
-            return payloads
-
-        # get the version from the initial payload
-        if isinstance(payloads[0], list):
-            version = Version(payloads[0][0]["version"])
-        else:
-            version = Version(payloads[0]["version"])
+        # collect versions and data from each page, checking versions along the way when flattening
+        _payloads = list(self.iter_records(record_type, *sources, batch=True, strict=flatten, **kwargs))
 
-        # collect versions and data from each payload
-        data_key = Schema(record_type).data_key
-        _payloads = []
-
-        for payload in payloads:
-            if not isinstance(payload, list):
-                payload = [payload]
-
-            for page in payload:
-                data = page["data"][data_key]
-
-                # insert last_updated and ttl data from outer payload into each vehicle record
-                if record_type == VEHICLES:
-                    last_updated, ttl = page["last_updated"], page["ttl"]
-                    for item in data:
-                        item["last_updated"] = last_updated
-                        item["ttl"] = ttl
-
-                _payloads.append((page["version"], data))
+        if len(_payloads) < 1:
+            return _payloads
 
         if flatten:
-            if not all([Version(v) == version for v,_ in _payloads]):
-                # find the first non-matching version and raise
-                unexpected = [Version(v) for v,_ in _payloads if Version(v) != version][0]
-                raise UnexpectedVersionError(unexpected, version)
             # return the version, records tuple
-            return version, [item for _,data in _payloads for item in data]
+            return _payloads[0][0], [item for _,data in _payloads for item in data]
         else:
             # list of version, records tuples
-            return [(Version(r[0]), r[1]) for r in _payloads]
+            return _payloads
 
     @classmethod
     def _filename(cls, **kwargs):
@@ -602,37 +1135,27 @@ class DataFile(BaseFile):
         payloads = kwargs.get("payloads", [])
         extension = kwargs.get("extension", ".json")
         payload = kwargs.get("payload", None)
+        summary = kwargs.get("summary") or cls._summarize(payloads, record_type)
 
         # is there a single record_type in these payloads that we should use?
-        record_types = set([list(p["data"].keys())[0] for p in payloads])
+        record_types = summary["record_types"]
         if record_type is None and len(record_types) == 1:
-            record_type = record_types.pop()
+            record_type = next(iter(record_types))
 
-        # no record_type specified, generate filename from payload hash
-        if record_type is None:
-            data = json.dumps(payload or payloads).encode()
+        # no record_type specified (or no records), generate filename from payload hash
+        if record_type is None or summary["start"] is None:
+            default = lambda obj: sorted(obj) if isinstance(obj, set) else str(obj)
+            data = json.dumps(payload or payloads or summary, default=default).encode()
             shadigest = hashlib.sha256(data).hexdigest()
             return f"{shadigest[0:7]}{extension}"
 
-        data_key = Schema(record_type).data_key
+        # time boundaries from the data
+        start, end = summary["start"], summary["end"]
 
-        # find time boundaries from the data
-        if record_type in [STATUS_CHANGES, EVENTS]:
-            time_key = "event_time"
-        elif record_type == TRIPS:
-            time_key = "end_time"
-        elif record_type == VEHICLES:
-            time_key = "last_event_time"
-
-        times = [d[time_key] for p in payloads for d in p["data"][data_key]]
-
-        if all([isinstance(t, datetime.datetime) for t in times]):
-            start = min(times)
-            end = max(times)
-        else:
+        if not isinstance(start, datetime.datetime) or not isinstance(end, datetime.datetime):
             decoder = TimestampDecoder()
-            start = decoder.decode(min(times))
-            end = decoder.decode(max(times))
+            start = decoder.decode(start)
+            end = decoder.decode(end)
 
         # clip to hour of day, offset if they are the same
         start = datetime.datetime(start.year, start.month, start.day, start.hour)
@@ -641,21 +1164,851 @@ class DataFile(BaseFile):
             end = end + datetime.timedelta(hours=1)
 
         encoder = TimestampEncoder(date_format="%Y%m%dT%H0000Z")
-        providers = set([d["provider_name"] for p in payloads for d in p["data"][data_key]])
+        providers = sorted(summary["providers"])
 
         return f"{'_'.join(providers)}_{record_type}_{encoder.encode(start)}_{encoder.encode(end)}{extension}"
 
+    def _sources_or_raise(self, record_type, sources):
+        """
+        Get a (record_type, sources) tuple to read from, or raise an exception if there are no sources.
+        """
+        sources = [self._parse(s) for s in sources]
+
+        # record_type is not a schema type, but a data source
+        if record_type and record_type not in SCHEMA_TYPES:
+            sources.append(self._parse(record_type))
+            record_type = None
+
+        if len(sources) == 0:
+            sources.extend(self._sources)
+
+        if len(sources) == 0:
+            raise IndexError("There are no sources to read from.")
+
+        return record_type or self.record_type, sources
+
+    @classmethod
+    def _summarize(cls, payloads, record_type=None, summary=None):
+        """
+        Summarize the record types, providers, versions, time range and count of the records in payloads,
+        optionally updating an existing summary.
+        """
+        if summary is None:
+            summary = dict(record_types=set(), providers=set(), versions=set(), start=None, end=None, count=0)
+
+        data_key = Schema.get(record_type).data_key if record_type in SCHEMA_TYPES else None
+
+        for payload in payloads:
+            payload_key = next(iter(payload["data"]), None)
+            if payload_key is None:
+                continue
+
+            summary["record_types"].add(payload_key)
+            summary["versions"].add(str(payload["version"]))
+
+            records = payload["data"].get(data_key or payload_key, [])
+            summary["count"] += len(records)
+            summary["providers"].update([r["provider_name"] for r in records if "provider_name" in r])
+
+            time_key = cls._time_key(record_type or payload_key)
+            times = [r[time_key] for r in records if r.get(time_key) is not None]
+
+            if len(times) > 0:
+                start, end = min(times), max(times)
+                summary["start"] = start if summary["start"] is None else min(summary["start"], start)
+                summary["end"] = end if summary["end"] is None else max(summary["end"], end)
+
+        return summary
+
+    @classmethod
+    @contextlib.contextmanager
+    def _tempfile(cls, directory):
+        """
+        Context manager for the Path of a temporary file in directory, that is removed when done.
+        """
+        path = pathlib.Path(directory, f".{uuid.uuid4().hex}.tmp")
+        try:
+            yield path
+        finally:
+            if path.exists():
+                path.unlink()
+
+    @classmethod
+    def _replace(cls, source, dest, append=False):
+        """
+        Atomically move the file at source to dest; or append its contents to an existing dest.
+        """
+        if append and dest.exists():
+            with source.open("rb") as src, dest.open("ab") as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            os.replace(source, dest)
+
+    @classmethod
+    def _time_key(cls, record_type):
+        """
+        Get the name of the field that best locates a record of the given type in time.
+        """
+        if record_type in [STATUS_CHANGES, EVENTS]:
+            return "event_time"
+        elif record_type == TRIPS:
+            return "end_time"
+        elif record_type == VEHICLES:
+            return "last_event_time"
+
+    @classmethod
+    def _parquet_timestamps(cls, series):
+        """
+        Convert a Series of MDS timestamps (datetime, UNIX milliseconds, or text) into UTC datetimes.
+        """
+        return TimestampDecoder().decode_many(series)
+
+    @classmethod
+    def _pyarrow_or_raise(cls):
+        """
+        Import the pyarrow modules used for Parquet support, or raise an exception.
+        """
+        try:
+            import pyarrow
+            import pyarrow.dataset
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet support requires pyarrow, e.g. pip install mds-provider[parquet]")
+
+        return pyarrow, pyarrow.parquet, pyarrow.dataset
+
+    @classmethod
+    def _read(cls, files, urls, headers, parallel=False, processes=False, **kwargs):
+        """
+        Generate the decoded contents of each file and then each URL, in order.
+        """
+        read_file = functools.partial(cls._read_file, **kwargs)
+        read_url = lambda u: cls._read_url(u, headers.get(u, headers))
+
+        if not parallel:
+            yield from map(read_file, files)
+            yield from map(read_url, urls)
+            return
+
+        workers = (os.cpu_count() or 1) if parallel is True else int(parallel)
+
+        with contextlib.ExitStack() as stack:
+            threads = stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=workers))
+            pool = threads
+            if processes and len(files) > 0:
+                pool = stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=workers))
+
+            # files then URLs, so URLs start being requested while the last files are read
+            tasks = itertools.chain(((pool, read_file, f) for f in files), ((threads, read_url, u) for u in urls))
+            pending = collections.deque()
+
+            try:
+                for executor, fn, arg in tasks:
+                    # limit the number of decoded contents waiting to be yielded, keeping them in order
+                    pending.append(executor.submit(fn, arg))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()
+
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # when the generator is closed early, don't read what won't be yielded
+                for future in pending:
+                    future.cancel()
+
+    @classmethod
+    def _read_file(cls, path, lazy=False, **kwargs):
+        """
+        Read and decode the JSON contents of a local (possibly compressed) file.
+
+        NDJSON files are decoded into a list of payloads; or with lazy=True, an iterator of payloads.
+        """
+        if cls._isndjson(path):
+            payloads = cls._read_ndjson(path, **kwargs)
+            return payloads if lazy else list(payloads)
+
+        with cls._mmap(path) as mapped:
+            if mapped is not None:
+                # decode straight from the mapped pages, without an intermediate copy of the file's bytes
+                with memoryview(mapped) as view:
+                    return json.loads(str(view, "utf-8"), **kwargs)
+
+        with cls._open(path) as f:
+            return json.loads(f.read(), **kwargs)
+
+    @classmethod
+    def _read_ndjson(cls, path, **kwargs):
+        """
+        Generate payloads from the lines of a local (possibly compressed) NDJSON file.
+        """
+        with cls._open(path) as f:
+            yield from cls._iter_ndjson(f, **kwargs)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _mmap(cls, path):
+        """
+        Map a local uncompressed file read-only into memory, shared with other processes reading the same file.
+
+        Yield the mmap.mmap, or None when the file can't be mapped (e.g. compressed or empty).
+        """
+        if cls._compression(path) is not None:
+            yield None
+            return
+
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            yield None
+            return
+
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+    @classmethod
+    def _iter_ndjson(cls, lines, **kwargs):
+        """
+        Generate payloads from lines of NDJSON: a header line with the payload's version and metadata,
+        followed by a line for each of its records.
+        """
+        payload, records = None, None
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            data = json.loads(line, **kwargs)
+
+            # records never have a version, headers always do
+            if "version" in data:
+                if payload is not None:
+                    yield payload
+                payload = data
+                records = next(iter(payload["data"].values()))
+            elif payload is None:
+                raise ValueError("Found an NDJSON record before any payload header.")
+            else:
+                records.append(data)
+
+        if payload is not None:
+            yield payload
+
+    @classmethod
+    def _write_payloads(cls, f, payloads, encoder, record_type=None, ndjson=False, single=False):
+        """
+        Write payloads to a text stream one at a time, as NDJSON; or as a JSON list of payloads, or with
+        single=True the one payload dict.
+
+        Return a summary of the payloads written.
+        """
+        summary = cls._summarize([], record_type)
+
+        if ndjson:
+            for payload in payloads:
+                cls._summarize([payload], record_type, summary)
+                cls._write_ndjson(f, [payload], encoder)
+        elif single:
+            payload = next(iter(payloads))
+            cls._summarize([payload], record_type, summary)
+            f.writelines(encoder.iterencode(payload))
+        else:
+            f.write("[")
+            for i, payload in enumerate(payloads):
+                cls._summarize([payload], record_type, summary)
+                if i > 0:
+                    f.write(encoder.item_separator)
+                f.writelines(encoder.iterencode(payload))
+            f.write("]")
+
+        return summary
+
+    @classmethod
+    def _write_ndjson(cls, f, payloads, encoder):
+        """
+        Write payloads as lines of NDJSON: a header line with the payload's version and metadata,
+        followed by a line for each of its records.
+        """
+        for payload in payloads:
+            # version first, so headers are easy to spot
+            header = { "version": payload["version"] }
+            header.update([(k,v) for k,v in payload.items() if k not in ("version", "data")])
+            header["data"] = dict([(k, []) for k in payload["data"].keys()])
+
+            f.write(encoder.encode(header))
+            f.write("\n")
+
+            for records in payload["data"].values():
+                for record in records:
+                    f.write(encoder.encode(record))
+                    f.write("\n")
+
+    @classmethod
+    def _read_url(cls, url, headers):
+        """
+        Request and decode the JSON contents of a URL, decompressing the content if needed.
+        """
+        r = requests.get(url, headers=headers)
+        text = None
+
+        for compression, magic in _COMPRESSION_MAGIC.items():
+            if r.content.startswith(magic):
+                with cls._open(io.BytesIO(r.content), compression=compression) as f:
+                    text = f.read()
+
+        if cls._isndjson(urllib.parse.urlparse(url).path):
+            return list(cls._iter_ndjson((text or r.text).splitlines()))
+
+        return r.json() if text is None else json.loads(text)
+
+    @classmethod
+    def _compression(cls, path):
+        """
+        Get the compression used for a file, based on its name.
+        """
+        suffix = pathlib.Path(path).suffix
+        return next((c for c,s in _COMPRESSION_SUFFIXES.items() if s == suffix), None)
+
+    @classmethod
+    def _compression_or_raise(cls, path, compression):
+        """
+        Get the compression to write a file with: the given compression, or the one its name implies.
+        Raise an exception when they contradict each other.
+        """
+        implied = cls._compression(path)
+        if compression and implied != compression:
+            suffix = cls._compression_suffix(compression)
+            raise ValueError(f"File name '{pathlib.Path(path).name}' doesn't match compression '{compression}', "
+                             f"e.g. use a name ending in '{suffix}'.")
+        return compression or implied
+
+    @classmethod
+    def _compression_suffix(cls, compression):
+        """
+        Get the file name suffix for the given compression, or raise an exception.
+        """
+        if compression is None:
+            return ""
+        if compression in _COMPRESSION_SUFFIXES:
+            return _COMPRESSION_SUFFIXES[compression]
+
+        valid = ", ".join(_COMPRESSION_SUFFIXES.keys())
+        raise ValueError(f"Invalid compression '{compression}'. Valid compressions: {valid}")
+
+    def _find(self, files, record_type, sources, kwargs):
+        """
+        Filter files down to those matching the index query in kwargs (removing the query from kwargs).
+        """
+        index = kwargs.pop("index", self.index)
+        query = dict([(k, kwargs.pop(k)) for k in ("providers", "start_time", "end_time") if k in kwargs])
+
+        dirs = [s.path for s in sources if self._isdir(s)]
+        index = self._index_or_none(index, dirs[0] if len(dirs) == 1 else None)
+
+        if index is None:
+            if "providers" in query:
+                raise ValueError("An index is required to query by providers.")
+            if query and not self._partitioned(files, dirs):
+                raise ValueError(f"An index or date-partitioned directories are required to query by "
+                                 f"{', '.join(query.keys())}.")
+            return files
+
+        indexed = set(index.files())
+        found = set(index.find(record_type, **query))
+
+        return [f for f in files if f.resolve() in found or f.resolve() not in indexed]
+
+    @classmethod
+    def _partitioned(cls, files, dirs):
+        """
+        Return True if every file was listed from within a date-partitioned directory under one of dirs,
+        so that a time query was already applied by DataFile._ls().
+        """
+        dirs = [pathlib.Path(d) for d in dirs]
+
+        for f in files:
+            parent = next((d for d in dirs if d in f.parents), None)
+            if parent is None:
+                return False
+
+            partition = ()
+            for name in f.relative_to(parent).parts[:-1]:
+                partition = cls._partition(name, partition)
+            if not partition:
+                return False
+
+        return True
+
+    @classmethod
+    def _ls_options(cls, kwargs):
+        """
+        Get the directory listing options given in kwargs (removing those only used for listing from kwargs).
+        """
+        options = dict([(k, kwargs.pop(k)) for k in ("recursive", "include", "exclude") if k in kwargs])
+        options.update([(k, kwargs[k]) for k in ("start_time", "end_time") if k in kwargs])
+        return options
+
+    @classmethod
+    def _index_or_none(cls, index, directory=None):
+        """
+        Get an IndexFile instance from the index argument, or None.
+        """
+        if index is True:
+            return IndexFile(directory) if directory else None
+        if index and not isinstance(index, IndexFile):
+            return IndexFile(index)
+        return index or None
+
+    @classmethod
+    def _isndjson(cls, path):
+        """
+        Return True if path names a (possibly compressed) NDJSON file.
+        """
+        return ".ndjson" in pathlib.Path(path).suffixes
+
+    @classmethod
+    def _open(cls, path, mode="r", compression=None):
+        """
+        Open a text stream over a local file or binary file object, (de)compressing as needed.
+
+        By default, the compression is determined from the path's suffix.
+        """
+        if compression is None and isinstance(path, (str, pathlib.Path)):
+            compression = cls._compression(path)
+
+        if compression is None:
+            return open(path, mode, encoding="utf-8")
+
+        # raises for an unsupported compression
+        cls._compression_suffix(compression)
+
+        if compression == "gzip":
+            return gzip.open(path, f"{mode}t", encoding="utf-8")
+
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd support requires zstandard, e.g. pip install mds-provider[zstd]")
+
+        stream = open(path, f"{mode}b") if isinstance(path, (str, pathlib.Path)) else path
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(stream)
+
+        return io.TextIOWrapper(stream, encoding="utf-8")
+
+    @classmethod
+    def _records(cls, page, record_type, data_key):
+        """
+        Get the list of records of the given type from a single payload page.
+        """
+        data = page["data"][data_key]
+
+        # insert last_updated and ttl data from outer payload into each vehicle record
+        if record_type == VEHICLES:
+            last_updated, ttl = page["last_updated"], page["ttl"]
+            for item in data:
+                item["last_updated"] = last_updated
+                item["ttl"] = ttl
+
+        return data
+
     @classmethod
-    def _ls(cls, sources):
+    def _ls(cls, sources, **kwargs):
         """
         Create a tuple of lists of valid file Paths and URLs from a list of urllib.parse.ParseResult.
+
+        Parameters:
+            sources: list
+                The urllib.parse.ParseResult to expand.
+
+            recursive: bool, optional
+                True to expand directories recursively. False (default) to expand only the top level.
+
+            include: str, list, optional
+                One or more glob patterns of files to include from directories, matched against the path relative
+                to the directory from the right (e.g. "trips/*.json"). By default, (compressed) JSON and NDJSON files.
+
+            exclude: str, list, optional
+                One or more glob patterns of files and directories to exclude from directories.
+
+            start_time: datetime, int, optional
+                Skip date-partitioned directories (e.g. YYYY/MM/DD, date=YYYY-MM-DD) entirely before this time.
+
+            end_time: datetime, int, optional
+                Skip date-partitioned directories entirely at or after this time.
+
+        Return:
+            tuple (files: list, urls: list)
         """
-        # separate into files and directories and urls
-        files = [pathlib.Path(f.path) for f in sources if cls._isfile(f)]
-        dirs = [pathlib.Path(d.path) for d in sources if cls._isdir(d)]
-        urls = [urllib.parse.urlunparse(u) for u in sources if cls._isurl(u)]
+        recursive = kwargs.get("recursive", False)
+        include = kwargs.get("include") or _LS_INCLUDE
+        exclude = kwargs.get("exclude") or []
+        start_time = IndexFile._timestamp(kwargs.get("start_time"))
+        end_time = IndexFile._timestamp(kwargs.get("end_time"))
+
+        # separate into files and directories and urls, with a single stat of each source
+        files, dirs, urls = [], [], []
+        for source in sources:
+            if cls._isurl(source):
+                urls.append(urllib.parse.urlunparse(source))
+                continue
+            st = cls._stat(source)
+            if st is None:
+                continue
+            elif stat.S_ISREG(st.st_mode):
+                files.append(pathlib.Path(source.path))
+            elif stat.S_ISDIR(st.st_mode):
+                dirs.append((pathlib.Path(source.path), st.st_mtime_ns))
+
+        include, exclude = cls._patterns(include), cls._patterns(exclude)
+
+        def matches(parts, patterns):
+            return next((i for i, (n, pattern) in enumerate(patterns)
+                         if len(parts) >= n and pattern.match("/".join(parts[-n:]))), None)
+
+        def walk(directory, parts, mtime, partition):
+            for name, is_dir in cls._scandir(directory, mtime):
+                entry_parts = (*parts, name)
+                if matches(entry_parts, exclude) is not None:
+                    continue
+                if is_dir:
+                    if not recursive:
+                        continue
+                    entry_partition = cls._partition(name, partition)
+                    if cls._outside(entry_partition, start_time, end_time):
+                        continue
+                    # a directory's own mtime only changes with its direct entries, so stat each on every walk
+                    path = os.path.join(directory, name)
+                    try:
+                        entry_mtime = os.stat(path).st_mtime_ns
+                    except OSError:
+                        continue
+                    yield from walk(path, entry_parts, entry_mtime, entry_partition)
+                else:
+                    i = matches(entry_parts, include)
+                    if i is not None:
+                        yield i, entry_parts
 
-        # expand into directories
-        files.extend([f for ls in [d.glob("*.json") for d in dirs] for f in ls])
+        # expand into directories, ordered by matching pattern and then path
+        for d, mtime in dirs:
+            files.extend([pathlib.Path(d, *parts) for _, parts in sorted(walk(str(d), (), mtime, ()))])
 
         return files, urls
+
+    @classmethod
+    def _patterns(cls, patterns):
+        """
+        Compile glob patterns into a list of tuples (count of path components: int, regex), for matching
+        paths from the right like pathlib.PurePath.match().
+        """
+        patterns = [patterns] if isinstance(patterns, str) else patterns
+        return [(len(pathlib.PurePosixPath(p).parts), re.compile(fnmatch.translate(p))) for p in patterns]
+
+    @classmethod
+    def _scandir(cls, directory, mtime_ns):
+        """
+        List a directory's entries as tuples (name: str, is_dir: bool), using the type information
+        from the directory listing itself.
+
+        Listings are cached and reused while the directory's current mtime_ns is unchanged.
+        """
+        with cls._listings_lock:
+            cached = cls._listings.get(directory)
+            if cached is not None and cached[0] == mtime_ns:
+                cls._listings.move_to_end(directory)
+                return cached[1]
+
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                    if not is_dir and not entry.is_file():
+                        continue
+                    entries.append((entry.name, is_dir))
+                except OSError:
+                    continue
+
+        with cls._listings_lock:
+            cls._listings[directory] = (mtime_ns, entries)
+            cls._listings.move_to_end(directory)
+            while len(cls._listings) > _LISTINGS_MAXSIZE:
+                cls._listings.popitem(last=False)
+
+        return entries
+
+    @classmethod
+    def _partition(cls, name, partition):
+        """
+        Extend the date partition (year, month, day) of a parent directory with a child directory's name,
+        one of: YYYY-MM-DD, date=YYYY-MM-DD, or the next of YYYY (year=YYYY), MM (month=MM), DD (day=DD).
+
+        Return the partition tuple, or () for directories outside of a date partition.
+        """
+        match = _DATE_PARTITION.fullmatch(name)
+        if match:
+            return tuple(int(g) for g in match.groups())
+
+        if len(partition) < len(_DATE_PARTITION_PARTS):
+            match = _DATE_PARTITION_PARTS[len(partition)].fullmatch(name)
+            return (*partition, int(match.group(1))) if match else ()
+
+        return partition
+
+    @classmethod
+    def _outside(cls, partition, start_time, end_time):
+        """
+        Return True if the date partition (year, month, day) lies entirely outside of [start_time, end_time),
+        given as UNIX milliseconds in UTC.
+        """
+        if not partition or (start_time is None and end_time is None):
+            return False
+
+        try:
+            year, month, day = (*partition, 1, 1)[:3]
+            lower = datetime.datetime(year, month, day, tzinfo=datetime.timezone.utc)
+            if len(partition) == 1:
+                upper = lower.replace(year=year + 1)
+            elif len(partition) == 2:
+                upper = lower.replace(year=year + month // 12, month=month % 12 + 1)
+            else:
+                upper = lower + datetime.timedelta(days=1)
+        except ValueError:
+            # not a date after all
+            return False
+
+        lower, upper = IndexFile._timestamp(lower), IndexFile._timestamp(upper)
+        return (end_time is not None and lower >= end_time) or (start_time is not None and upper <= start_time)
+
+
+class IndexFile(BaseFile):
+    """
+    Work with an index of MDS Provider payload files, kept in a SQLite database.
+
+    For each file, the index records the record type, providers, MDS version, time range and count of records,
+    so that reads can skip the files that don't overlap a query.
+    """
+
+    def __init__(self, path=None, **kwargs):
+        """
+        Parameters:
+            path: str, Path, optional
+                A path to the index database file; or to a directory of payload files, indexed in
+                a database file within. By default, use the current directory.
+                A path that doesn't exist yet names a database file if it has a suffix (e.g. index.sqlite),
+                otherwise a directory.
+        """
+        super().__init__(path, **kwargs)
+
+        path = pathlib.Path(path or ".")
+        is_dir = path.is_dir() or (not path.exists() and path.suffix == "")
+        self.path = pathlib.Path(path, INDEX_FILE_NAME) if is_dir else path
+
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<mds.files.IndexFile ('{self.path}')>"
+
+    @property
+    def connection(self):
+        """
+        Get the connection to the index database, creating the database as needed.
+        """
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._connection.executescript(_INDEX_SCHEMA)
+
+        return self._connection
+
+    def add(self, path, summary, append=False):
+        """
+        Add a file to the index, or update its entry.
+
+        Parameters:
+            path: str, Path
+                The path to the payload file.
+
+            summary: dict
+                A summary of the payloads in the file, see DataFile._summarize().
+
+            append: bool, optional
+                True if summary describes payloads appended to the file, to merge with its existing entry.
+                False (default) to replace any existing entry.
+
+        Return:
+            IndexFile
+                self
+        """
+        path = pathlib.Path(path).resolve()
+        st = path.stat()
+
+        record_types = summary["record_types"]
+        record_type = next(iter(record_types)) if len(record_types) == 1 else None
+        providers = set(summary["providers"])
+        versions = set(summary["versions"])
+        start, end = self._timestamp(summary["start"]), self._timestamp(summary["end"])
+        count = summary["count"]
+
+        with self._lock, self.connection as conn:
+            if append:
+                existing = conn.execute(
+                    "SELECT record_type, versions, start_time, end_time, record_count FROM files WHERE path = ?",
+                    (str(path),)
+                ).fetchone()
+
+                if existing:
+                    _record_type, _versions, _start, _end, _count = existing
+                    record_type = record_type if _record_type == record_type else None
+                    versions.update(_versions.split(","))
+                    start = min([t for t in (start, _start) if t is not None], default=None)
+                    end = max([t for t in (end, _end) if t is not None], default=None)
+                    count += _count
+                    providers.update([p for p, in conn.execute(
+                        "SELECT provider_name FROM file_providers WHERE path = ?", (str(path),)
+                    )])
+
+            conn.execute("DELETE FROM file_providers WHERE path = ?", (str(path),))
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(path), record_type, ",".join(sorted(versions)), start, end, count, st.st_size, st.st_mtime_ns)
+            )
+            conn.executemany(
+                "INSERT INTO file_providers VALUES (?, ?)",
+                [(str(path), provider) for provider in sorted(providers)]
+            )
+
+        return self
+
+    def build(self, *sources, **kwargs):
+        """
+        Index payload files, skipping files that are unchanged since they were last indexed,
+        and removing entries for files that no longer exist.
+
+        Parameters:
+            sources: str, Path, list, optional
+                One or more paths to (directories containing) MDS payload files.
+                By default, the directory containing the index.
+
+            ls: callable(sources=list): tuple (files: list, urls: list), optional
+                A function that receives a list of urllib.parse.ParseResult, and returns
+                a tuple of a list of valid files, and a list of valid URLs (ignored).
+
+            recursive, include, exclude: optional
+                Directory listing options, see DataFile._ls().
+
+        Return:
+            IndexFile
+                self
+        """
+        sources = [self._parse(s) for s in sources] or [self._parse(self.path.parent)]
+        ls = kwargs.get("ls", DataFile._ls)
+        files, _ = ls(sources, **DataFile._ls_options(kwargs))
+
+        indexed = dict([(path, (size, mtime)) for path, size, mtime in
+                        self.connection.execute("SELECT path, size, mtime_ns FROM files")])
+
+        for f in files:
+            path, st = f.resolve(), f.stat()
+            if indexed.get(str(path)) == (st.st_size, st.st_mtime_ns):
+                continue
+
+            payloads = DataFile._read_file(path)
+            payloads = [payloads] if isinstance(payloads, dict) else payloads
+            self.add(path, DataFile._summarize(payloads))
+
+        self.prune()
+
+        return self
+
+    def files(self):
+        """
+        Get the list of indexed file Paths.
+        """
+        return [pathlib.Path(p) for p, in self.connection.execute("SELECT path FROM files ORDER BY path")]
+
+    def find(self, record_type=None, providers=None, start_time=None, end_time=None):
+        """
+        Find indexed files with records matching a query.
+
+        Parameters:
+            record_type: str, optional
+                Only find files of this type of MDS Provider record; or of mixed record types.
+
+            providers: str, list, optional
+                Only find files with records from the given provider_name(s).
+
+            start_time: datetime, int, optional
+                Only find files with records at or after the given time.
+                Should be a datetime or int UNIX milliseconds.
+
+            end_time: datetime, int, optional
+                Only find files with records before the given time.
+                Should be a datetime or int UNIX milliseconds.
+
+        Return:
+            list
+                The Paths of matching files.
+        """
+        query, params = ["SELECT path FROM files WHERE 1 = 1"], []
+
+        if record_type:
+            data_key = Schema.get(record_type).data_key
+            query.append("AND (record_type = ? OR record_type IS NULL)")
+            params.append(data_key)
+
+        if providers:
+            providers = [providers] if isinstance(providers, str) else list(providers)
+            placeholders = ", ".join(["?"] * len(providers))
+            query.append(f"AND path IN (SELECT path FROM file_providers WHERE provider_name IN ({placeholders}))")
+            params.extend(providers)
+
+        if start_time is not None:
+            query.append("AND end_time >= ?")
+            params.append(self._timestamp(start_time))
+
+        if end_time is not None:
+            query.append("AND start_time < ?")
+            params.append(self._timestamp(end_time))
+
+        query.append("ORDER BY path")
+
+        return [pathlib.Path(p) for p, in self.connection.execute(" ".join(query), params)]
+
+    def prune(self):
+        """
+        Remove entries for files that no longer exist.
+
+        Return:
+            IndexFile
+                self
+        """
+        missing = [(str(p),) for p in self.files() if not p.exists()]
+
+        with self._lock, self.connection as conn:
+            conn.executemany("DELETE FROM files WHERE path = ?", missing)
+            conn.executemany("DELETE FROM file_providers WHERE path = ?", missing)
+
+        return self
+
+    @classmethod
+    def _timestamp(cls, value):
+        """
+        Convert an MDS timestamp (datetime, UNIX milliseconds, or text) into int UNIX milliseconds.
+        """
+        if value is None:
+            return None
+        if isinstance(value, numbers.Real) and not isinstance(value, bool):
+            return int(value)
+        if not isinstance(value, datetime.datetime):
+            value = TimestampDecoder().decode(value)
+        if value.tzinfo is None:
+            # naive datetimes are UTC, not local time
+            value = value.replace(tzinfo=datetime.timezone.utc)
+
+        return int(round(value.timestamp() * 1000))
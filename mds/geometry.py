@@ -2,11 +2,17 @@
 Helpers for GeoJSON-based geometry objects.
 """
 
+import abc
+import collections.abc
+import hashlib
 import json
 import os
+import threading
 
 import fiona
+import numpy
 import requests
+import shapely
 import shapely.geometry
 import shapely.ops
 
@@ -15,6 +21,8 @@ def parse_boundary(boundary_file, **kwargs):
     """
     Read boundary geometry from a local or remote geojson file.
 
+    Boundaries are cached by path or URL and content, see Boundary.parse().
+
     Parameters:
         boundary_file: str
             A path to a local file or URL to a remote file with boundary data in geojson format.
@@ -22,26 +30,14 @@ def parse_boundary(boundary_file, **kwargs):
         output: str, optional
             If boundary_file is a URL, download and save the file to this directory.
 
+        refresh: bool, optional
+            If boundary_file is a URL, True to download the file again even if it was saved before.
+
     Return:
         shapely.geometry.Polygon
-            A single unioned Polygon representing the (composite) boundary.
+            A single unioned Polygon representing the (composite) boundary, prepared for containment tests.
     """
-    if boundary_file.lower().startswith("http") and boundary_file.lower().endswith(".geojson"):
-        r = requests.get(boundary_file)
-        file_name = boundary_file.split("/")[-1]
-        path = os.path.join(kwargs.get("output", "."), file_name)
-
-        with open(path, "w") as f:
-            json.dump(r.json(), f)
-
-        boundary_file = path
-
-    # meld all the features together into a unified polygon
-    features = fiona.open(boundary_file)
-    polygons = [shapely.geometry.shape(feature["geometry"]) for feature in features]
-    polygons_meld = shapely.ops.unary_union(polygons)
-
-    return shapely.geometry.Polygon(polygons_meld)
+    return Boundary.parse(boundary_file, **kwargs).polygon
 
 
 def extract_point(feature):
@@ -56,6 +52,9 @@ def extract_point(feature):
         shapely.geometry.Point
             The Point representation of the coordinate geometry.
     """
+    if isinstance(feature, Location):
+        return feature.point
+
     coords = feature["geometry"]["coordinates"]
     return shapely.geometry.Point(coords[0], coords[1])
 
@@ -75,19 +74,388 @@ def to_feature(shape, properties={}):
         dict
             The GeoJSON Feature object.
     """
-    feature = shapely.geometry.mapping(shape)
-    feature["properties"] = properties
-    feature["geometry"] = {}
-
-    if isinstance(shape, shapely.geometry.Point):
-        feature["geometry"]["coordinates"] = list(feature["coordinates"])
+    # build the GeoJSON directly from coordinates, in the same layout as mapping() would give
+    if shape.is_empty:
+        coordinates = []
+    elif isinstance(shape, shapely.geometry.Point):
+        coordinates = [shape.x, shape.y, shape.z] if shape.has_z else [shape.x, shape.y]
     else:
         # assume shape is polygon (multipolygon will break)
-        feature["geometry"]["coordinates"] = [list(list(coords) for coords in part) for part in feature["coordinates"]]
-
-    # 'type' at the top level is Feature, and in 'geometry' should be set
-    feature["geometry"]["type"] = feature["type"]
-    feature["type"] = "Feature"
-    # 'coordinates' in the top level is not valid geoJSON.
-    feature.pop("coordinates")
-    return feature
+        rings = [shape.exterior, *shape.interiors]
+        coordinates = [numpy.asarray(ring.coords).tolist() for ring in rings]
+
+    return {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": { "coordinates": coordinates, "type": shape.geom_type }
+    }
+
+
+def coordinates(features):
+    """
+    Extract the coordinates of many GeoJSON Point features at once.
+
+    Parameters:
+        features: iterable
+            GeoJSON Point Features (dict-like) or Locations, e.g. a DataFrame's event_location column.
+
+    Return:
+        numpy.ndarray
+            Of shape (n, 2), with the (longitude, latitude) of each feature. NaN where a feature is missing
+            or isn't a Point.
+    """
+    xs, ys = [], []
+
+    for feature in features:
+        if isinstance(feature, Location):
+            xs.append(feature.x)
+            ys.append(feature.y)
+            continue
+        try:
+            geometry = feature["geometry"]
+            if geometry["type"] != "Point":
+                raise ValueError
+            x, y = geometry["coordinates"][:2]
+        except (KeyError, IndexError, TypeError, ValueError):
+            x, y = numpy.nan, numpy.nan
+        xs.append(x)
+        ys.append(y)
+
+    return numpy.column_stack((numpy.asarray(xs, dtype=numpy.float64), numpy.asarray(ys, dtype=numpy.float64)))
+
+
+def contains(boundary, points):
+    """
+    Test which of many points lie inside a boundary, in a single vectorized operation.
+
+    Parameters:
+        boundary: shapely.geometry.Polygon, Boundary
+            The boundary, e.g. from parse_boundary(). It is prepared for repeated queries as needed.
+
+        points: array-like
+            The points to test, either:
+            * an array-like of shape (n, 2) of (longitude, latitude) coordinates, e.g. a list of (x, y)
+              tuples or a DataFrame of coordinate columns
+            * GeoJSON Point Features or Locations, e.g. a DataFrame's event_location column
+
+    Return:
+        numpy.ndarray
+            Of bool, True for each point inside the boundary. Points on the boundary's edge, and
+            missing points, are False.
+    """
+    if isinstance(boundary, Boundary):
+        boundary = boundary.polygon
+
+    try:
+        coords = numpy.asarray(points)
+    except ValueError:
+        # ragged input, e.g. a mix of Features and missing values
+        coords = None
+
+    if coords is None or coords.dtype == object or coords.ndim != 2 or coords.shape[1] != 2:
+        coords = coordinates(points)
+    else:
+        coords = coords.astype(numpy.float64, copy=False)
+
+    if not shapely.is_prepared(boundary):
+        shapely.prepare(boundary)
+
+    x, y = coords[:, 0], coords[:, 1]
+    mask = numpy.zeros(len(coords), dtype=bool)
+
+    # only points within the boundary's bounding box need the full test
+    min_x, min_y, max_x, max_y = boundary.bounds
+    candidates = numpy.flatnonzero((x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y))
+    mask[candidates] = shapely.contains_xy(boundary, x[candidates], y[candidates])
+
+    return mask
+
+
+class Boundary():
+    """
+    A boundary Polygon, prepared for fast containment tests.
+    """
+
+    # Boundary instances by (path or URL, content hash), see parse()
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, polygon):
+        """
+        Parameters:
+            polygon: shapely.geometry.Polygon
+                The boundary geometry, prepared in place.
+        """
+        self.polygon = polygon
+        if not shapely.is_prepared(polygon):
+            shapely.prepare(polygon)
+
+    def __repr__(self):
+        return f"<mds.geometry.Boundary {self.polygon.bounds}>"
+
+    @property
+    def bounds(self):
+        """
+        The (min_x, min_y, max_x, max_y) bounding box of this Boundary.
+        """
+        return self.polygon.bounds
+
+    def contains(self, points):
+        """
+        Test which of many points lie inside this Boundary. See contains().
+        """
+        return contains(self.polygon, points)
+
+    @classmethod
+    def parse(cls, boundary_file, **kwargs):
+        """
+        Read a Boundary from a local or remote geojson file.
+
+        Files are only parsed the first time their content is seen at a path or URL.
+        A URL is downloaded the first time it is parsed with a given output directory, and saved there under a
+        name derived from the URL. Afterwards the saved file is used as-is: only refresh=True downloads it again.
+
+        Parameters:
+            boundary_file: str
+                A path to a local file or URL to a remote file with boundary data in geojson format.
+
+            output: str, optional
+                If boundary_file is a URL, download and save the file to this directory.
+
+            refresh: bool, optional
+                If boundary_file is a URL, True to download the file again even if it was saved before.
+                This is the only way to pick up changes to the remote file.
+
+        Return:
+            Boundary
+        """
+        source = str(boundary_file)
+        path = source
+
+        if source.lower().startswith("http") and source.lower().endswith(".geojson"):
+            # name the saved file after the whole URL, so different URLs ending in the same file name don't collide
+            digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+            file_name = f"{digest}_{source.split('/')[-1]}"
+            path = os.path.join(kwargs.get("output", "."), file_name)
+
+            if kwargs.get("refresh", False) or not os.path.isfile(path):
+                r = requests.get(source)
+                with open(path, "w") as f:
+                    json.dump(r.json(), f)
+        else:
+            source = os.path.abspath(source)
+
+        with open(path, "rb") as f:
+            key = (source, hashlib.sha256(f.read()).hexdigest())
+
+        with cls._cache_lock:
+            boundary = cls._cache.get(key)
+
+        if boundary is None:
+            boundary = cls(cls._read_polygon(path))
+            with cls._cache_lock:
+                boundary = cls._cache.setdefault(key, boundary)
+
+        return boundary
+
+    @classmethod
+    def _read_polygon(cls, path):
+        """
+        Meld all the features of a geojson file together into a unified polygon.
+        """
+        with fiona.open(path) as features:
+            polygons = [shapely.geometry.shape(feature["geometry"]) for feature in features]
+
+        polygons_meld = shapely.ops.unary_union(polygons)
+        return shapely.geometry.Polygon(polygons_meld)
+
+
+def compact(geojson):
+    """
+    Get the compact representation of GeoJSON point geometry.
+
+    Parameters:
+        geojson: dict-like
+            A GeoJSON Point Feature, or FeatureCollection of Point Features.
+
+    Return:
+        Location, Route
+            The compact representation of geojson. Anything else (e.g. None, or Points with a z coordinate)
+            is returned as is.
+    """
+    if isinstance(geojson, CompactGeometry) or not isinstance(geojson, dict):
+        return geojson
+
+    if geojson.get("type") == "Feature" and _is_2d_point(geojson):
+        return Location.from_feature(geojson)
+
+    if geojson.get("type") == "FeatureCollection":
+        features = geojson.get("features", [])
+        if all(_is_2d_point(f) for f in features):
+            return Route.from_features(features)
+
+    return geojson
+
+
+def _is_2d_point(feature):
+    """
+    True if feature is a GeoJSON Point Feature with only (longitude, latitude) coordinates.
+    """
+    if isinstance(feature, Location):
+        return True
+
+    try:
+        geometry = feature.get("geometry") or {}
+        return geometry.get("type") == "Point" and len(geometry.get("coordinates") or []) == 2
+    except (AttributeError, TypeError):
+        return False
+
+
+class CompactGeometry(collections.abc.Mapping):
+    """
+    Base for compact, read-only representations of GeoJSON.
+
+    Only coordinates and properties are kept; the GeoJSON is built on access, e.g. when serializing.
+    Serialize records holding compact geometry (e.g. with JsonEncoder) before validating them against MDS schemas.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self.to_geojson()[key]
+
+    def __iter__(self):
+        return iter(self.to_geojson())
+
+    def __len__(self):
+        return len(self.to_geojson())
+
+    @abc.abstractmethod
+    def to_geojson(self):
+        """
+        Build the GeoJSON dict this geometry represents.
+        """
+
+
+class Location(CompactGeometry):
+    """
+    A compact GeoJSON Point Feature, e.g. an event_location.
+    """
+
+    __slots__ = ("x", "y", "properties")
+
+    def __init__(self, x, y, properties=None):
+        """
+        Parameters:
+            x: float
+                The longitude.
+
+            y: float
+                The latitude.
+
+            properties: dict, optional
+                Entries for the Feature's properties collection.
+        """
+        self.x = float(x)
+        self.y = float(y)
+        self.properties = {} if properties is None else properties
+
+    def __repr__(self):
+        return f"<mds.geometry.Location ({self.x}, {self.y})>"
+
+    def __getitem__(self, key):
+        # avoid building the whole Feature for a single key
+        if key == "type":
+            return "Feature"
+        if key == "properties":
+            return self.properties
+        if key == "geometry":
+            return { "coordinates": [self.x, self.y], "type": "Point" }
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("type", "properties", "geometry"))
+
+    def __len__(self):
+        return 3
+
+    @classmethod
+    def from_feature(cls, feature):
+        """
+        Create a Location from a GeoJSON Point Feature with (longitude, latitude) coordinates.
+        """
+        coords = feature["geometry"]["coordinates"]
+        if len(coords) != 2:
+            raise ValueError("Location requires a Point with exactly two coordinates.")
+        return cls(coords[0], coords[1], feature.get("properties"))
+
+    @classmethod
+    def from_point(cls, point, properties=None):
+        """
+        Create a Location from a shapely Point.
+        """
+        return cls(point.x, point.y, properties)
+
+    @property
+    def point(self):
+        """
+        The shapely Point at this Location.
+        """
+        return shapely.geometry.Point(self.x, self.y)
+
+    def to_geojson(self):
+        """
+        Build the GeoJSON Feature dict for this Location.
+        """
+        return {
+            "type": "Feature",
+            "properties": self.properties,
+            "geometry": { "coordinates": [self.x, self.y], "type": "Point" }
+        }
+
+
+class Route(CompactGeometry):
+    """
+    A compact GeoJSON FeatureCollection of Point Features, e.g. a trip route.
+    """
+
+    __slots__ = ("coordinates", "properties")
+
+    def __init__(self, coordinates, properties=None):
+        """
+        Parameters:
+            coordinates: array-like
+                The (longitude, latitude) of each Point, in order.
+
+            properties: list, optional
+                Entries for each Feature's properties collection.
+        """
+        self.coordinates = numpy.asarray(coordinates, dtype=numpy.float64).reshape(-1, 2)
+        self.properties = [{} for _ in range(len(self.coordinates))] if properties is None else list(properties)
+
+        if len(self.properties) != len(self.coordinates):
+            raise ValueError("Route requires properties for each of its coordinates.")
+
+    def __repr__(self):
+        return f"<mds.geometry.Route ({len(self.coordinates)} points)>"
+
+    @classmethod
+    def from_features(cls, features):
+        """
+        Create a Route from a list of GeoJSON Point Features with (longitude, latitude) coordinates, or Locations.
+        """
+        locations = [f if isinstance(f, Location) else Location.from_feature(f) for f in features]
+        return cls([(loc.x, loc.y) for loc in locations], [loc.properties for loc in locations])
+
+    @property
+    def locations(self):
+        """
+        The Location of each Point along this Route.
+        """
+        return [Location(x, y, p) for (x, y), p in zip(self.coordinates.tolist(), self.properties)]
+
+    def to_geojson(self):
+        """
+        Build the GeoJSON FeatureCollection dict for this Route.
+        """
+        return { "type": "FeatureCollection", "features": [loc.to_geojson() for loc in self.locations] }
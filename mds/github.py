@@ -1,6 +1,16 @@
 """
 Data and helpers for MDS on GitHub.
 """
+import hashlib
+import os
+import pathlib
+import re
+import shutil
+import time
+import uuid
+
+import requests
+
 from .versions import Version
 
 
@@ -18,6 +28,18 @@ MDS_PROVIDER_REGISTRY = "/".join(MDS_RAW + ("{}/providers.csv",))
 MDS_OLD_SCHEMA = "/".join(MDS_RAW + ("{}/provider/{}.json",))
 MDS_SCHEMA = "/".join(MDS_RAW + ("{}/provider/dockless/{}.json",))
 
+# local cache of downloaded files, overridden by the MDS_CACHE_DIR environment variable
+MDS_CACHE_DIR = pathlib.Path.home() / ".cache" / "mds-provider"
+
+# seconds until cached files of a branch ref expire; files of a version tag or commit never expire
+MDS_CACHE_TTL = 24 * 60 * 60
+
+# released MDS versions supported by this library, e.g. for prefetch()
+MDS_VERSIONS = ["0.3.0", "0.3.1", "0.3.2", "0.4.0", "0.4.1"]
+
+# refs that never change: version tags and full commit hashes
+_IMMUTABLE_REF = re.compile(r"\d+\.\d+\.\d+|[0-9a-f]{40}")
+
 
 def registry_url(ref=None):
     """
@@ -90,3 +112,154 @@ def is_pre_mds_040(ref) -> bool:
     except Exception as e:
         print(f"Unable to determine MDS version from '{ref}', assuming 0.4.0 or greater. Error: {e}")
         return False
+
+
+def cache_dir():
+    """
+    Get the directory of the local cache of downloaded files.
+
+    Return:
+        Path
+    """
+    return pathlib.Path(os.environ.get("MDS_CACHE_DIR") or MDS_CACHE_DIR)
+
+
+def download(url, ttl=None, refresh=False, cache=True):
+    """
+    Download a file from GitHub, using the local cache where possible.
+
+    Files are looked up in this order:
+    * the local cache, unless expired or refresh=True
+    * GitHub, updating the local cache
+    * the local cache, even if expired, when GitHub can't be reached
+
+    Parameters:
+        url: str
+            The URL of the file to download, e.g. from schema_url() or registry_url().
+
+        ttl: int, optional
+            The number of seconds until cached files of a branch ref expire. By default, MDS_CACHE_TTL.
+
+        refresh: bool, optional
+            True to download the file again, even if it is cached. The default is False.
+
+        cache: bool, optional
+            False to skip the local cache. The default is True.
+
+    Raise:
+        requests.exceptions.RequestException
+            When the file isn't available locally and the request fails.
+
+    Return:
+        bytes
+    """
+    if not cache:
+        return _request(url)
+
+    path = _cache_path(url)
+    ref = path.parts[0]
+    cached = cache_dir() / path
+
+    ttl = MDS_CACHE_TTL if ttl is None else ttl
+    fresh = cached.is_file() and (_IMMUTABLE_REF.fullmatch(ref) or time.time() - cached.stat().st_mtime < ttl)
+
+    if fresh and not refresh:
+        return cached.read_bytes()
+
+    try:
+        content = _request(url)
+    except requests.exceptions.RequestException:
+        if cached.is_file():
+            return cached.read_bytes()
+        raise
+
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        temp = cached.with_name(f".{uuid.uuid4()}.tmp")
+        temp.write_bytes(content)
+        os.replace(temp, cached)
+    except OSError:
+        # the cache is best-effort
+        pass
+
+    return content
+
+
+def prefetch(refs=None, refresh=False):
+    """
+    Download the provider registry and schemas of MDS versions into the local cache.
+
+    Files of version tags never expire, so once prefetched they are read without network access.
+    To prepare hosts without network access, prefetch on a connected host and seed() the hosts with the
+    resulting cache directory (or point MDS_CACHE_DIR at a copy of it).
+
+    Parameters:
+        refs: list, optional
+            The refs (e.g. version str or Version instances) to download. By default, MDS_VERSIONS.
+
+        refresh: bool, optional
+            True to download files again, even if they are cached. The default is False.
+
+    Raise:
+        requests.exceptions.RequestException
+            When a file isn't cached and the request fails.
+
+    Return:
+        list
+            The Path of each file in the local cache.
+    """
+    from .schemas import SCHEMA_TYPES, EVENTS, VEHICLES
+
+    paths = []
+
+    for ref in (refs or MDS_VERSIONS):
+        # events and vehicles were introduced with MDS 0.4.0
+        schema_types = [t for t in SCHEMA_TYPES if not is_pre_mds_040(ref) or t not in (EVENTS, VEHICLES)]
+        urls = [registry_url(ref)] + [schema_url(t, ref) for t in schema_types]
+
+        for url in urls:
+            download(url, refresh=refresh)
+            paths.append(cache_dir() / _cache_path(url))
+
+    return paths
+
+
+def seed(source):
+    """
+    Copy the files of a directory laid out like the local cache (e.g. populated by prefetch() on another host)
+    into the local cache, replacing any cached copies.
+
+    Parameters:
+        source: str, Path
+            The directory to copy from.
+
+    Return:
+        Path
+            The local cache directory.
+    """
+    source = pathlib.Path(source)
+    if not source.is_dir():
+        raise ValueError(f"No cache directory to seed from at: {source}")
+
+    return pathlib.Path(shutil.copytree(source, cache_dir(), dirs_exist_ok=True))
+
+
+def _cache_path(url):
+    """
+    Get the relative path of a downloaded file in the local cache: its path within the MDS repository
+    (starting with the ref), or a hash of any other URL.
+    """
+    prefix = "/".join(MDS_RAW) + "/"
+    if url.startswith(prefix):
+        return pathlib.Path(url[len(prefix):])
+
+    return pathlib.Path("urls", hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+
+def _request(url):
+    """
+    Request the content at url, raising for unsuccessful responses.
+    """
+    r = requests.get(url)
+    r.raise_for_status()
+    return r.content
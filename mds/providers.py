@@ -5,8 +5,6 @@ import csv
 import pathlib
 import uuid
 
-import requests
-
 import mds.github
 from .schemas import STATUS_CHANGES, TRIPS, EVENTS, VEHICLES
 from .versions import Version
@@ -135,10 +133,14 @@ class Registry():
 
             path: str, Path, optional
                 A path to a local registry file to skip the GitHub download.
+
+            refresh: bool, optional
+                Whether to download the registry again, rather than use a locally cached copy.
+                The default is False. See mds.github.download().
         """
         key = (str(ref), path)
-        if key not in self._registry:
-            self._registry[key] = self._get_registry(*key)
+        if key not in self._registry or kwargs.get("refresh"):
+            self._registry[key] = self._get_registry(*key, refresh=kwargs.get("refresh", False))
 
         self.providers = self._registry[key]
         self.ref = ref
@@ -177,16 +179,16 @@ class Registry():
         return Provider(found, **kwargs) if found else None
 
     @staticmethod
-    def _get_registry(ref, path):
+    def _get_registry(ref, path, refresh=False):
         if path:
             path = pathlib.Path(path)
             with path.open("r") as f:
                 return Registry._parse_csv(f.readlines(), ref=ref, path=path)
         else:
             url = mds.github.registry_url(ref)
-            with requests.get(url, stream=True) as r:
-                lines = (line.decode("utf-8").replace(", ", ",") for line in r.iter_lines())
-                return Registry._parse_csv(lines, ref=ref, path=path)
+            content = mds.github.download(url, refresh=refresh)
+            lines = (line.replace(", ", ",") for line in content.decode("utf-8").splitlines())
+            return Registry._parse_csv(lines, ref=ref, path=path)
 
     @staticmethod
     def _parse_csv(lines, **kwargs):
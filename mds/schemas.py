@@ -2,10 +2,18 @@
 Work with the MDS Provider JSON Schemas.
 """
 
+import collections
+import concurrent.futures
+import copy
+import json
 import os
+import re
+import threading
+import types
 
 import jsonschema
-import requests
+import numpy
+import pandas as pd
 
 import mds.geometry
 import mds.github
@@ -18,12 +26,42 @@ EVENTS = "events"
 VEHICLES = "vehicles"
 SCHEMA_TYPES = [ STATUS_CHANGES, TRIPS, EVENTS, VEHICLES ]
 
+VALIDATOR_BACKENDS = [ "jsonschema", "fastjsonschema", "fastpath" ]
+
+# compiled validators, least recently used first, keyed by (schema_type, ref, backend)
+_VALIDATORS = collections.OrderedDict()
+_VALIDATORS_LOCK = threading.Lock()
+_VALIDATORS_MAXSIZE = 32
+
+# JSON Schema keywords checked by the fastpath backend; subschemas using any others are checked by jsonschema
+_FASTPATH_KEYWORDS = {
+    "$ref", "type", "enum", "const", "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum",
+    "minLength", "maxLength", "pattern", "items", "minItems", "maxItems", "required", "properties",
+    "additionalProperties", "allOf", "$id", "$schema", "$comment", "title", "description", "default", "examples",
+    "format"
+}
+
+# checks for each JSON Schema type
+_FASTPATH_TYPES = {
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: type(v) is int or (isinstance(v, float) and v.is_integer()),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
 
 class Schema():
     """
     Represents a MDS Provider JSON Schema.
     """
 
+    _instances = {}
+    _instances_lock = threading.Lock()
+    _acquire_lock = threading.Lock()
+
     def __init__(self, schema_type, ref=None, **kwargs):
         """
         Initialize a new Schema instance.
@@ -40,6 +78,10 @@ class Schema():
 
             acquire: bool, optional
                 Whether to immediately acquire the schema document from GitHub. The default is False.
+
+            refresh: bool, optional
+                Whether to download the schema document again, rather than use a locally cached copy.
+                The default is False. See mds.github.download().
         """
         if schema_type not in SCHEMA_TYPES:
             valid_types = ", ".join(SCHEMA_TYPES)
@@ -47,6 +89,8 @@ class Schema():
 
         # the underlying schema document is not acquired until necessary
         self._schema = None
+        self._validator = None
+        self._derived = {}
 
         # configuration
         self.schema_type = schema_type
@@ -62,6 +106,7 @@ class Schema():
                 self.ref.raise_if_unsupported()
 
         self.schema_url = mds.github.schema_url(schema_type, self.ref)
+        self.refresh = kwargs.get("refresh", False)
 
         if kwargs.get("acquire"):
             self._acquire()
@@ -69,19 +114,36 @@ class Schema():
     def __repr__(self):
         return f"<mds.schemas.Schema ('{self.schema_type}', '{self.ref}', '{self.schema_url}')>"
 
+    def __getstate__(self):
+        """
+        Pickle the schema document and configuration, leaving out the compiled validator and derived properties
+        (rebuilt on demand), e.g. for sending to a process pool.
+        """
+        state = dict(self.__dict__)
+        state["_validator"] = None
+        state["_derived"] = {}
+        return state
+
     def _acquire(self):
         """
-        On-demand, one-time acquisition of the schema document from GitHub.
+        On-demand, one-time acquisition of the schema document from GitHub, or a local copy.
         """
-        if not self._schema:
+        if self._schema:
+            return
+
+        with self._acquire_lock:
+            if self._schema:
+                return
             try:
-                self._schema = requests.get(self.schema_url).json()
+                schema = json.loads(mds.github.download(self.schema_url, refresh=self.refresh))
             except:
                 raise ValueError(f"Problem requesting schema from: {self.schema_url}")
-            finally:
-                # override the $id for a non-standard ref
-                if self._schema and self.ref != mds.github.MDS_DEFAULT_REF:
-                    self._schema["$id"] = self.schema_url
+
+            # override the $id for a non-standard ref
+            if schema and self.ref != mds.github.MDS_DEFAULT_REF:
+                schema["$id"] = self.schema_url
+
+            self._schema = schema
 
     def validate(self, instance_source):
         """
@@ -98,8 +160,9 @@ class Schema():
                 An iterator that yields validation errors.
         """
         self._acquire()
-        validator = DataValidator(self)
-        for error in validator.validate(instance_source):
+        if self._validator is None:
+            self._validator = DataValidator(self)
+        for error in self._validator.validate(instance_source):
             yield error
 
     @property
@@ -113,15 +176,70 @@ class Schema():
     @property
     def event_types(self):
         """
-        Get the list of valid event_type values for this schema.
+        Get the tuple of valid event_type values for this schema.
         """
-        self._acquire()
-        return list(self.event_type_reasons.keys())
+        return self._memoize("event_types", lambda: tuple(self.event_type_reasons.keys()))
 
     @property
     def event_type_reasons(self):
         """
-        Get a dict(event_type=list(event_type_reason)) for this schema.
+        Get a read-only dict(event_type=tuple(event_type_reason)) for this schema.
+        """
+        return self._memoize("event_type_reasons", self._event_type_reasons)
+
+    @property
+    def reason_event_types(self):
+        """
+        Get a read-only dict(event_type_reason=event_type) for this schema, the inverse of event_type_reasons.
+        """
+        return self._memoize("reason_event_types", lambda: types.MappingProxyType(dict(
+            [(reason, event_type) for event_type, reasons in self.event_type_reasons.items() for reason in reasons]
+        )))
+
+    @property
+    def item_schema(self):
+        """
+        Get the schema for items in this schema's data array (e.g. the status_change or trip records).
+        """
+        return self._memoize("item_schema",
+                             lambda: self.schema["properties"]["data"]["properties"][self.data_key]["items"])
+
+    @property
+    def optional_item_fields(self):
+        """
+        Returns the tuple of optional field names for items in the data array of this schema.
+        """
+        def optional_item_fields():
+            required = frozenset(self.required_item_fields)
+            return tuple([ip for ip in self.item_schema["properties"].keys() if ip not in required])
+
+        return self._memoize("optional_item_fields", optional_item_fields)
+
+    @property
+    def required_item_fields(self):
+        """
+        Returns the tuple of required field names for items in the data array of this schema.
+        """
+        return self._memoize("required_item_fields", lambda: tuple(self.item_schema["required"]))
+
+    @property
+    def propulsion_types(self):
+        """
+        Get the tuple of valid propulsion_type values for this schema.
+        """
+        return self._memoize("propulsion_types",
+                             lambda: tuple(self.schema["definitions"]["propulsion_type"]["items"]["enum"]))
+
+    @property
+    def vehicle_types(self):
+        """
+        Get the tuple of valid vehicle_type values for this schema.
+        """
+        return self._memoize("vehicle_types", lambda: tuple(self.schema["definitions"]["vehicle_type"]["enum"]))
+
+    def _event_type_reasons(self):
+        """
+        Collect the event_type_reasons for this schema from the item schema.
         """
         etr = {}
         if self.data_key == STATUS_CHANGES:
@@ -129,9 +247,7 @@ class Schema():
         elif self.data_key == VEHICLES:
             event_key, reason_key = "last_event_type", "last_event_type_reason"
         else:
-            return etr
-
-        self._acquire()
+            return types.MappingProxyType(etr)
 
         if "allOf" in self.item_schema:
             for allOf in self.item_schema["allOf"]:
@@ -147,80 +263,74 @@ class Schema():
             if event_key in props and reason_key in props:
                 event_type = props[event_key]["enum"][0]
                 event_type_reasons = props[reason_key]["enum"]
-                etr[event_type] = event_type_reasons
+                etr[event_type] = tuple(event_type_reasons)
 
-        return etr
+        return types.MappingProxyType(etr)
 
-    @property
-    def item_schema(self):
+    def _memoize(self, name, compute):
         """
-        Get the schema for items in this schema's data array (e.g. the status_change or trip records).
+        Get a value derived from the schema document, computing it on first access.
         """
-        self._acquire()
-        return self.schema["properties"]["data"]["properties"][self.data_key]["items"]
+        if name not in self._derived:
+            self._acquire()
+            self._derived[name] = compute()
+        return self._derived[name]
 
-    @property
-    def optional_item_fields(self):
-        """
-        Returns the list of optional field names for items in the data array of this schema.
+    @classmethod
+    def get(cls, schema_type, ref=None):
         """
-        self._acquire()
-        item_props = self.item_schema["properties"].keys()
-        return [ip for ip in item_props if ip not in self.required_item_fields]
+        Get the shared Schema instance for a schema_type and ref, creating it on first use.
 
-    @property
-    def required_item_fields(self):
-        """
-        Returns the list of required field names for items in the data array of this schema.
-        """
-        self._acquire()
-        return self.item_schema["required"]
+        The schema document of a shared instance is acquired at most once per process.
 
-    @property
-    def propulsion_types(self):
-        """
-        Get the list of valid propulsion_type values for this schema.
-        """
-        self._acquire()
-        definition = self.schema["definitions"]["propulsion_type"]
-        return definition["items"]["enum"]
+        Parameters:
+            schema_type: str
+                The type of MDS Provider schema.
 
-    @property
-    def vehicle_types(self):
-        """
-        Get the list of valid vehicle_type values for this schema.
+            ref: str, Version, optional
+                Reference the schema at the version specified. See Schema().
+
+        Return:
+            Schema
         """
-        self._acquire()
-        definition = self.schema["definitions"]["vehicle_type"]
-        return definition["enum"]
+        key = (schema_type, str(ref or mds.github.MDS_DEFAULT_REF))
+
+        schema = cls._instances.get(key)
+        if schema is None:
+            with cls._instances_lock:
+                schema = cls._instances.get(key)
+                if schema is None:
+                    schema = cls._instances[key] = Schema(schema_type, ref)
+
+        return schema
 
     @classmethod
     def status_changes(cls, ref=None):
         """
         Get the Status Changes schema.
         """
-        return Schema(STATUS_CHANGES, ref)
+        return Schema.get(STATUS_CHANGES, ref)
 
     @classmethod
     def trips(cls, ref=None):
         """
         Get the Trips schema.
         """
-        return Schema(TRIPS, ref)
+        return Schema.get(TRIPS, ref)
 
     @classmethod
     def events(cls, ref=None):
         """
         Get the Events schema.
         """
-        return Schema(EVENTS, ref)
+        return Schema.get(EVENTS, ref)
 
     @classmethod
     def vehicles(cls, ref=None):
         """
         Get the Vehicles schema.
         """
-        return Schema(VEHICLES, ref)
+        return Schema.get(VEHICLES, ref)
 
 
 class DataValidationError():
@@ -326,7 +436,7 @@ class DataValidator():
     Validate MDS Provider data against JSON Schemas.
     """
 
-    def __init__(self, schema=None, ref=None):
+    def __init__(self, schema=None, ref=None, backend=None):
         """
         Initialize a new DataValidator.
 
@@ -337,7 +447,19 @@ class DataValidator():
 
             ref: str, Version, optional
                 The reference (git commit, branch, tag, or version) at which to reference the schema.
+
+            backend: str, optional
+                The validation library to use, one of VALIDATOR_BACKENDS. By default, jsonschema.
+                With fastjsonschema, each schema is compiled into Python code that quickly accepts valid data;
+                invalid data is re-checked with jsonschema to describe all of its errors.
+                With fastpath, each record is checked against the required fields, types, enums, patterns and
+                ranges of the schema's items; only records failing those checks are re-checked with jsonschema.
         """
+        if backend is not None and backend not in VALIDATOR_BACKENDS:
+            valid_backends = ", ".join(VALIDATOR_BACKENDS)
+            raise ValueError(f"Invalid backend '{backend}'. Valid backends: {valid_backends}")
+
+        self.backend = backend or VALIDATOR_BACKENDS[0]
         self.schema = self._get_schema_instance_or_raise(schema, ref)
         self.ref = self.schema.ref
         self.schema_type = self.schema.schema_type
@@ -354,13 +476,13 @@ class DataValidator():
         if isinstance(schema, Schema):
             return schema
         elif schema in SCHEMA_TYPES:
-            return Schema(schema, ref=ref)
+            return Schema.get(schema, ref)
         elif isinstance(getattr(self, "schema", None), Schema):
             return self.schema
         else:
             raise ValueError("Could not obtain a schema for validation.")
 
-    def validate(self, instance_source, schema=None, ref=None):
+    def validate(self, instance_source, schema=None, ref=None, **kwargs):
         """
         Validate MDS Provider data against a schema.
 
@@ -379,6 +501,13 @@ class DataValidator():
             ref: str, Version, optional
                 The reference (git commit, branch, tag, or version) at which to reference the schema.
 
+            parallel: bool, int, optional
+                True to validate chunks of records concurrently with a pool of processes, one per CPU; or
+                an int number of processes. False (default) to validate in this process.
+
+            chunksize: int, optional
+                With parallel, the number of records in each chunk. The default is 1000.
+
         Return:
             iterator
                 Zero or more DataValidationError instances.
@@ -394,9 +523,16 @@ class DataValidator():
             except:
                 raise TypeError(f"Unrecognized instance_source type: {type(instance_source)}.")
 
-        # schema is a Schema instance
-        # schema.schema is the JSON Schema (dict) associated with it
-        v = self._get_validator(schema.schema)
+        # jsonschema only accepts dicts as objects
+        instances = (self._geojson(instance, schema.data_key) for instance in instances)
+
+        parallel = kwargs.get("parallel", False)
+        if parallel:
+            yield from self._validate_parallel(instances, schema, parallel, kwargs.get("chunksize", 1000))
+            return
+
+        # compiled validators are shared by all instances validating the same schema
+        v = self._get_validator(schema, self.backend)
 
         # handles case when instance_source pointed to a list of payloads
         for instance in instances:
@@ -404,12 +540,300 @@ class DataValidator():
             for error in v.iter_errors(instance):
                 yield DataValidationError(error, instance, schema)
 
+    def validate_dataframe(self, df, schema=None, ref=None):
+        """
+        Validate a DataFrame of MDS Provider records (e.g. from DataFile.load_dataframe()) against a schema,
+        with vectorized checks of each column.
+
+        Checks required fields, types of scalar and array fields, enums (including event_type and event_type_reason
+        pairs and propulsion_type lists), patterns (e.g. UUIDs), numeric ranges, and timestamps. Nested objects such
+        as geometries are not checked; use validate() for a complete validation.
+
+        Parameters:
+            df: DataFrame
+                The records to validate, one per row. Timestamps can be UNIX milliseconds or datetimes.
+
+            schema: str, Schema, optional
+                The type of schema to validate; or
+                A Schema instance to use for validation.
+
+            ref: str, Version, optional
+                The reference (git commit, branch, tag, or version) at which to reference the schema.
+
+        Return:
+            tuple (mask: Series, errors: DataFrame)
+                A boolean Series that is True for rows passing all checks; and a DataFrame summarizing the failed
+                checks, with columns field, check, count (of failing rows) and example (index of a failing row).
+        """
+        schema = self._get_schema_instance_or_raise(schema, ref)
+        definitions = schema.schema.get("definitions", {})
+        item_schema = schema.item_schema
+
+        # check rows by position, since the index of concatenated frames has duplicate labels
+        index, df = df.index, df.reset_index(drop=True)
+        required = set(item_schema.get("required", []))
+        failures = collections.OrderedDict()
+
+        def resolve(subschema):
+            while "$ref" in subschema and subschema["$ref"].startswith("#/definitions/"):
+                subschema = definitions[subschema["$ref"][len("#/definitions/"):]]
+            return subschema
+
+        def fail(field, check, failed):
+            failed = failed.fillna(True).astype(bool) if failed.dtype == object else failed
+            if failed.any():
+                # combine checks of the same kind, e.g. the type of numbers and integers
+                previous = failures.get((field, check))
+                failures[(field, check)] = failed if previous is None else previous | failed
+
+        for field in sorted(required.difference(df.columns)):
+            fail(field, "required", pd.Series(True, index=df.index))
+
+        if item_schema.get("additionalProperties") is False:
+            for field in sorted(set(df.columns).difference(item_schema.get("properties", {}))):
+                fail(field, "additionalProperties", df[field].notna())
+
+        for field, subschema in item_schema.get("properties", {}).items():
+            if field not in df.columns:
+                continue
+
+            subschema = resolve(subschema)
+            column = df[field]
+            present = column.notna()
+            field_types = subschema.get("type", [])
+            field_types = [field_types] if isinstance(field_types, str) else field_types
+
+            if field in required and "null" not in field_types:
+                fail(field, "required", ~present)
+
+            if "number" in field_types or "integer" in field_types:
+                values = self._dataframe_numbers(column)
+                fail(field, "type", present & values.isna())
+                if "integer" in field_types and "number" not in field_types:
+                    fail(field, "type", values.notna() & (values % 1 != 0))
+                if "minimum" in subschema:
+                    fail(field, "minimum", values < subschema["minimum"])
+                if "maximum" in subschema:
+                    fail(field, "maximum", values > subschema["maximum"])
+            elif "string" in field_types:
+                is_str = self._dataframe_strings(column)
+                fail(field, "type", present & ~is_str)
+                if "enum" in subschema:
+                    fail(field, "enum", is_str & ~column.isin(subschema["enum"]))
+                if "pattern" in subschema:
+                    fail(field, "pattern", is_str & ~column.str.contains(subschema["pattern"], regex=True, na=False))
+            elif "array" in field_types:
+                is_list = column.map(lambda v: isinstance(v, (list, tuple, numpy.ndarray)))
+                fail(field, "type", present & ~is_list)
+                lengths = column[is_list].map(len).reindex(df.index)
+                if "minItems" in subschema:
+                    fail(field, "minItems", lengths < subschema["minItems"])
+                item_enum = resolve(subschema.get("items", {})).get("enum")
+                if item_enum is not None:
+                    items = column[is_list & (lengths > 0)].explode()
+                    invalid = (~items.isin(item_enum)).groupby(level=0).any()
+                    fail(field, "enum", invalid.reindex(df.index, fill_value=False))
+            elif "enum" in subschema:
+                fail(field, "enum", present & ~column.isin(subschema["enum"]))
+
+        # event_type and event_type_reason pairs
+        event_type_reasons = schema.event_type_reasons
+        if event_type_reasons:
+            prefix = "" if schema.data_key == STATUS_CHANGES else "last_"
+            event_key, reason_key = f"{prefix}event_type", f"{prefix}event_type_reason"
+            if event_key in df.columns:
+                events = df[event_key]
+                fail(event_key, "enum", events.notna() & ~events.isin(list(event_type_reasons.keys())))
+                if reason_key in df.columns:
+                    pairs = pd.MultiIndex.from_tuples([(e, r) for e, rs in event_type_reasons.items() for r in rs])
+                    reasons = df[reason_key]
+                    valid = pd.MultiIndex.from_arrays([events, reasons]).isin(pairs)
+                    fail(reason_key, "enum", pd.Series(~valid, index=df.index) & events.notna() & reasons.notna())
+
+        # timestamps in order
+        if "start_time" in df.columns and "end_time" in df.columns:
+            start, end = self._dataframe_numbers(df["start_time"]), self._dataframe_numbers(df["end_time"])
+            fail("end_time", "after start_time", end < start)
+
+        mask = numpy.ones(len(df), dtype=bool)
+        for failed in failures.values():
+            mask &= ~failed.to_numpy()
+
+        errors = pd.DataFrame(
+            [(field, check, int(failed.sum()), index[failed.to_numpy().argmax()])
+             for (field, check), failed in failures.items()],
+            columns=["field", "check", "count", "example"]
+        )
+
+        return pd.Series(mask, index=index), errors
+
     @classmethod
-    def _get_validator(cls, schema):
+    def _dataframe_numbers(cls, column):
         """
-        Helper to return a jsonschema.IValidator instance for the given JSON schema object.
+        Get a numeric Series from a column of numbers, or datetimes as UNIX milliseconds, with NaN for other values.
         """
-        return jsonschema.Draft6Validator(schema)
+        if pd.api.types.is_datetime64_any_dtype(column):
+            if column.dt.tz is None:
+                column = column.dt.tz_localize("UTC")
+            return (column - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(milliseconds=1)
+        if pd.api.types.is_bool_dtype(column):
+            return pd.Series(float("nan"), index=column.index)
+        if column.dtype == object:
+            # bools are not numbers in JSON Schema, but to_numeric converts them to 0 and 1
+            column = column.mask(column.map(lambda v: isinstance(v, (bool, numpy.bool_))))
+        return pd.to_numeric(column, errors="coerce")
+
+    @classmethod
+    def _dataframe_strings(cls, column):
+        """
+        Get a boolean Series that is True for the str values in a column.
+        """
+        if column.dtype == object or pd.api.types.is_string_dtype(column):
+            try:
+                return column.str.len().notna()
+            except AttributeError:
+                # an object column without any str values
+                pass
+        return pd.Series(False, index=column.index)
+
+    @classmethod
+    def _geojson(cls, instance, data_key):
+        """
+        Get an instance with any compact geometry of its records (see mds.geometry.compact()) as GeoJSON dicts.
+        """
+        data = instance.get("data") if isinstance(instance, dict) else None
+        items = data.get(data_key) if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            return instance
+
+        compact = mds.geometry.CompactGeometry
+        is_compact = [isinstance(r, dict) and any([isinstance(v, compact) for v in r.values()]) for r in items]
+        if not any(is_compact):
+            return instance
+
+        items = [dict([(k, v.to_geojson() if isinstance(v, compact) else v) for k, v in r.items()]) if c else r
+                 for r, c in zip(items, is_compact)]
+        return dict(instance, data=dict(data, **{data_key: items}))
+
+    def _validate_parallel(self, instances, schema, parallel, chunksize):
+        """
+        Validate chunks of each instance's records across a pool of processes, yielding DataValidationError
+        in the same order as sequential validation.
+        """
+        workers = None if parallel is True else int(parallel)
+        initargs = (schema, self.backend)
+
+        def chunks():
+            for instance in instances:
+                data = instance.get("data")
+                items = data.get(schema.data_key) if isinstance(data, dict) else None
+                if not isinstance(items, list) or len(items) <= chunksize:
+                    yield instance, 0, instance
+                    continue
+                for start in range(0, len(items), chunksize):
+                    chunk = dict(instance, data=dict(data, **{schema.data_key: items[start:start + chunksize]}))
+                    yield instance, start, chunk
+
+        with concurrent.futures.ProcessPoolExecutor(workers, initializer=self._init_worker, initargs=initargs) as pool:
+            # keep the original instance and offset of each chunk in order, without sending them to the pool
+            tasks = list(chunks())
+            results = pool.map(self._validate_chunk, [(start, chunk) for _, start, chunk in tasks])
+
+            for (instance, start, _), errors in zip(tasks, results):
+                for error in errors:
+                    error = jsonschema.ValidationError(**error)
+                    yield DataValidationError(error, instance, schema)
+
+    @classmethod
+    def _init_worker(cls, schema, backend):
+        """
+        Compile the validator used by a worker process.
+        """
+        cls._worker_validator = cls._compile(schema, backend)
+
+    @classmethod
+    def _validate_chunk(cls, task):
+        """
+        Validate a chunk of records in a worker process, returning picklable error details
+        with item indices offset to their position in the original instance.
+
+        Errors outside of the data array are only reported for the first chunk of an instance.
+        """
+        start, chunk = task
+        errors = []
+
+        for error in cls._worker_validator.iter_errors(chunk):
+            path = list(error.path)
+            is_item = len(path) >= 3 and path[0] == "data" and isinstance(path[2], int)
+            if is_item:
+                path[2] += start
+            elif start > 0:
+                continue
+
+            errors.append(dict(
+                message=error.message,
+                validator=error.validator,
+                path=path,
+                schema_path=list(error.schema_path),
+                instance=error.instance,
+                validator_value=error.validator_value
+            ))
+
+        return errors
+
+    @classmethod
+    def _get_validator(cls, schema, backend=None):
+        """
+        Helper to return a validator with an iter_errors(instance) method for the given Schema instance,
+        or JSON schema object.
+
+        Validators for Schema instances are cached by (schema_type, ref, backend).
+        """
+        if not isinstance(schema, Schema):
+            return cls._compile(schema, backend)
+
+        key = (schema.schema_type, str(schema.ref), backend)
+
+        with _VALIDATORS_LOCK:
+            if key in _VALIDATORS:
+                _VALIDATORS.move_to_end(key)
+                return _VALIDATORS[key]
+
+        validator = cls._compile(schema, backend)
+
+        with _VALIDATORS_LOCK:
+            _VALIDATORS[key] = validator
+            while len(_VALIDATORS) > _VALIDATORS_MAXSIZE:
+                _VALIDATORS.popitem(last=False)
+
+        return validator
+
+    @classmethod
+    def _compile(cls, schema, backend=None):
+        """
+        Compile a validator for the given Schema instance, or JSON schema object.
+        """
+        if backend == "fastpath" and isinstance(schema, Schema):
+            return _FastPathValidator(schema)
+
+        schema = schema.schema if isinstance(schema, Schema) else schema
+        validator = jsonschema.Draft6Validator(schema)
+
+        if backend == "fastjsonschema":
+            try:
+                import fastjsonschema
+            except ImportError:
+                raise ImportError("The fastjsonschema backend requires fastjsonschema, "
+                                  "e.g. pip install mds-provider[fastjsonschema]")
+
+            try:
+                # fastjsonschema rewrites the $refs of the schema it compiles, which is shared by all validators
+                return _FastValidator(fastjsonschema.compile(copy.deepcopy(schema)), validator)
+            except fastjsonschema.JsonSchemaDefinitionException:
+                # fall back to jsonschema for schemas that can't be compiled
+                pass
+
+        return validator
 
     @classmethod
     def status_changes(cls, ref=None):
@@ -438,3 +862,189 @@ class DataValidator():
         Create a Vehicles validator.
         """
         return DataValidator(VEHICLES, ref)
+
+
+class _FastValidator():
+    """
+    Validate with a compiled fastjsonschema function, falling back to a jsonschema validator
+    to describe the errors in invalid instances.
+    """
+
+    def __init__(self, validate, validator):
+        self._validate = validate
+        self._validator = validator
+
+    def iter_errors(self, instance):
+        """
+        Generate the jsonschema.exceptions.ValidationError for an instance, if any.
+        """
+        try:
+            self._validate(instance)
+        except Exception:
+            yield from self._validator.iter_errors(instance)
+
+
+class _FastPathValidator():
+    """
+    Validate payloads with checks compiled from a Schema's item_schema, falling back to jsonschema to describe
+    the errors of records failing those checks. The rest of the payload is always validated with jsonschema.
+    """
+
+    def __init__(self, schema):
+        self._data_key = schema.data_key
+        self._definitions = schema.schema.get("definitions", {})
+        self._validator = jsonschema.Draft6Validator(schema.schema)
+        self._item_validator = self._fallback(schema.item_schema)
+
+        self._event_type_reasons = {}
+        if schema.data_key in (STATUS_CHANGES, VEHICLES):
+            prefix = "" if schema.data_key == STATUS_CHANGES else "last_"
+            self._event_keys = (f"{prefix}event_type", f"{prefix}event_type_reason")
+            self._event_type_reasons = dict([(k, set(v)) for k, v in schema.event_type_reasons.items()])
+
+        self._check = self._compile_item(schema.item_schema)
+
+    def iter_errors(self, instance):
+        """
+        Generate the jsonschema.exceptions.ValidationError for an instance, if any.
+        """
+        data = instance.get("data") if isinstance(instance, dict) else None
+        items = data.get(self._data_key) if isinstance(data, dict) else None
+
+        if not isinstance(items, list):
+            yield from self._validator.iter_errors(instance)
+            return
+
+        # validate the rest of the payload without its records
+        yield from self._validator.iter_errors(dict(instance, data=dict(data, **{self._data_key: []})))
+
+        for index, item in enumerate(items):
+            if self._check(item):
+                continue
+            for error in self._item_validator.iter_errors(item):
+                error.path.extendleft([index, self._data_key, "data"])
+                yield error
+
+    def _compile_item(self, item_schema):
+        """
+        Compile the checks for a record, replacing the combination of event_type and event_type_reason
+        subschemas with a lookup in the Schema's event_type_reasons.
+        """
+        if not self._event_type_reasons:
+            return self._compile_check(item_schema)
+
+        event_key, reason_key = self._event_keys
+        etr = self._event_type_reasons
+
+        def about_events(sub):
+            return "oneOf" in sub and all(["properties" in s and event_key in s["properties"] for s in sub["oneOf"]])
+
+        item_schema = dict(item_schema)
+        if about_events(item_schema):
+            item_schema.pop("oneOf")
+        if "allOf" in item_schema:
+            item_schema["allOf"] = [sub for sub in item_schema["allOf"] if not about_events(sub)]
+
+        check = self._compile_check(item_schema)
+
+        def check_item(record):
+            if not isinstance(record, dict) or record.get(event_key) not in etr:
+                return False
+            if reason_key in record and record[reason_key] not in etr[record[event_key]]:
+                return False
+            return check(record)
+
+        return check_item
+
+    def _compile_check(self, subschema):
+        """
+        Compile a subschema into a function returning True for valid values.
+        """
+        # follow references within the schema's definitions
+        while "$ref" in subschema and subschema["$ref"].startswith("#/definitions/"):
+            subschema = self._definitions[subschema["$ref"][len("#/definitions/"):]]
+
+        if "$ref" in subschema or not set(subschema).issubset(_FASTPATH_KEYWORDS):
+            return self._fallback(subschema).is_valid
+
+        checks = []
+
+        if "type" in subschema:
+            types = [_FASTPATH_TYPES[t] for t in ([subschema["type"]] if isinstance(subschema["type"], str)
+                                                  else subschema["type"])]
+            checks.append(types[0] if len(types) == 1 else lambda v: any([t(v) for t in types]))
+
+        if "enum" in subschema:
+            enum = subschema["enum"]
+            checks.append(lambda v: v in enum)
+
+        if "const" in subschema:
+            const = subschema["const"]
+            checks.append(lambda v: v == const)
+
+        number = _FASTPATH_TYPES["number"]
+        if "minimum" in subschema:
+            minimum = subschema["minimum"]
+            checks.append(lambda v: not number(v) or v >= minimum)
+        if "maximum" in subschema:
+            maximum = subschema["maximum"]
+            checks.append(lambda v: not number(v) or v <= maximum)
+        if "exclusiveMinimum" in subschema:
+            exclusive_minimum = subschema["exclusiveMinimum"]
+            checks.append(lambda v: not number(v) or v > exclusive_minimum)
+        if "exclusiveMaximum" in subschema:
+            exclusive_maximum = subschema["exclusiveMaximum"]
+            checks.append(lambda v: not number(v) or v < exclusive_maximum)
+
+        if "minLength" in subschema:
+            min_length = subschema["minLength"]
+            checks.append(lambda v: not isinstance(v, str) or len(v) >= min_length)
+        if "maxLength" in subschema:
+            max_length = subschema["maxLength"]
+            checks.append(lambda v: not isinstance(v, str) or len(v) <= max_length)
+        if "pattern" in subschema:
+            pattern = re.compile(subschema["pattern"])
+            checks.append(lambda v: not isinstance(v, str) or pattern.search(v) is not None)
+
+        if isinstance(subschema.get("items"), dict):
+            item = self._compile_check(subschema["items"])
+            checks.append(lambda v: not isinstance(v, list) or all(map(item, v)))
+        elif "items" in subschema:
+            return self._fallback(subschema).is_valid
+        if "minItems" in subschema:
+            min_items = subschema["minItems"]
+            checks.append(lambda v: not isinstance(v, list) or len(v) >= min_items)
+        if "maxItems" in subschema:
+            max_items = subschema["maxItems"]
+            checks.append(lambda v: not isinstance(v, list) or len(v) <= max_items)
+
+        if "required" in subschema:
+            required = subschema["required"]
+            checks.append(lambda v: not isinstance(v, dict) or all([r in v for r in required]))
+        if "properties" in subschema:
+            properties = [(k, self._compile_check(p)) for k, p in subschema["properties"].items()]
+            checks.append(lambda v: not isinstance(v, dict) or all([k not in v or p(v[k]) for k, p in properties]))
+        if "additionalProperties" in subschema:
+            additional = subschema["additionalProperties"]
+            known = set(subschema.get("properties", {}))
+            if additional is False:
+                checks.append(lambda v: not isinstance(v, dict) or known.issuperset(v))
+            elif isinstance(additional, dict):
+                other = self._compile_check(additional)
+                checks.append(lambda v: not isinstance(v, dict) or all([other(v[k]) for k in v if k not in known]))
+
+        checks.extend([self._compile_check(sub) for sub in subschema.get("allOf", [])])
+
+        def check(value):
+            for c in checks:
+                if not c(value):
+                    return False
+            return True
+
+        return checks[0] if len(checks) == 1 else check
+
+    def _fallback(self, subschema):
+        """
+        Get a jsonschema validator for a subschema, resolving references to the schema's definitions.
+        """
+        return jsonschema.Draft6Validator(dict(subschema, definitions=self._definitions))
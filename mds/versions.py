@@ -42,8 +42,21 @@ class Version():
     everything from `MAJOR.MINOR.0` up to but not including `MAJOR.MINOR+1.0` is supported.
 
     Pre-release versions are also supported, e.g. `MAJOR.MINOR.PATCH-alpha1`.
+
+    Versions are immutable, and interned: parsing the same version str again returns the same instance.
     """
 
+    _instances = {}
+    _instances_maxsize = 1024
+
+    def __new__(cls, version):
+        if isinstance(version, Version):
+            return version
+        if not isinstance(version, str):
+            raise TypeError("version")
+
+        return cls._instances.get(version) or super().__new__(cls)
+
     def __init__(self, version):
         """
         Initialize a new Version.
@@ -52,25 +65,31 @@ class Version():
             version: str, Version
                 The semver-formatted version string; or another Version instance.
         """
-        if isinstance(version, Version):
-            version = str(version)
-        if not isinstance(version, str):
-            raise TypeError("version")
-
-        self._version = self._parse(version)
+        # interned instances are already initialized
+        if hasattr(self, "_version"):
+            return
+
+        # the original str, e.g. for pickling, since the normalized str drops pre-release data
+        self._input = version
+
+        try:
+            self._version = self._parse(version)
+        except packaging.version.InvalidVersion:
+            # packaging 22+ no longer parses non-PEP 440 versions into a LegacyVersion
+            self._version = None
         self._legacy = None
 
-        if isinstance(self._version, packaging.version.LegacyVersion):
+        if not isinstance(self._version, packaging.version.Version):
             # versions like "0.3.x" or "0.x"
             try:
                 # assume the highest PATCH support
-                major, minor, legacy = str(self._version).split(".")
+                major, minor, legacy = version.split(".")
                 self._version = self._parse(f"{major}.{minor}.{sys.maxsize}")
                 # note the highest valid version tuple index, and the "legacy" data
                 self._legacy = (1, legacy)
             except:
                 # assume the highest MINOR.PATCH support
-                major, legacy = str(self._version).split(".")
+                major, legacy = version.split(".")
                 self._version = self._parse(f"{major}.{sys.maxsize}.{sys.maxsize}")
                 # note the highest valid version tuple index, and the "legacy" data
                 self._legacy = (0, legacy)
@@ -83,10 +102,25 @@ class Version():
             self._version = self._parse(f"{self.tuple[0]}.{self.tuple[1]}.{sys.maxsize}")
             self._legacy = (1, None)
 
+        # precompute the representations used in comparisons
+        self._tuple = self._release()
+        self._str = self._repr()
+
+        if len(self._instances) < self._instances_maxsize:
+            self._instances[version] = self
+
     def _parse(self, version):
         return packaging.version.parse(version)
 
-    def __repr__(self):
+    def _release(self):
+        if self._legacy:
+            index, _ = self._legacy
+            parts = [p for p in self._version.release if self._version.release.index(p) <= index]
+            return tuple(parts)
+        else:
+            return self._version.release
+
+    def _repr(self):
         if self._legacy:
             _,legacy = self._legacy
             parts = [p for p in [*self.tuple, legacy] if p is not None]
@@ -94,6 +128,12 @@ class Version():
         else:
             return ".".join(map(str, self.tuple))
 
+    def __repr__(self):
+        return self._str
+
+    def __reduce__(self):
+        return (Version, (self._input,))
+
     @property
     def header(self):
         """
@@ -123,12 +163,7 @@ class Version():
         """
         An int tuple representation of this Version.
         """
-        if self._legacy:
-            index, _ = self._legacy
-            parts = [p for p in self._version.release if self._version.release.index(p) <= index]
-            return tuple(parts)
-        else:
-            return self._version.release
+        return getattr(self, "_tuple", None) or self._release()
 
     def raise_if_unsupported(self):
         """
@@ -138,6 +173,8 @@ class Version():
             raise UnsupportedVersionError(self)
 
     def __eq__(self, version2):
+        if self is version2:
+            return True
         if isinstance(version2, Version):
             return self._version.__eq__(version2._version)
         else:
@@ -168,6 +205,8 @@ class Version():
             return str(self) < str(version2)
 
     def __ne__(self, version2):
+        if self is version2:
+            return False
         if isinstance(version2, Version):
             return self._version.__ne__(version2._version)
         else:
@@ -239,7 +278,7 @@ class Version():
 
         This is for internal use only and subject to change/deprecate in a future version.
         """
-        return Version("0.4.0")
+        return _VERSION_040
 
     @classmethod
     def _041_(cls):
@@ -248,4 +287,8 @@ class Version():
 
         This is for internal use only and subject to change/deprecate in a future version.
         """
-        return Version("0.4.1")
+        return _VERSION_041
+
+
+_VERSION_040 = Version("0.4.0")
+_VERSION_041 = Version("0.4.1")
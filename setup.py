@@ -22,15 +22,22 @@ setuptools.setup(
     install_requires=[
         "Fiona",
         "jsonschema",
+        "numpy",
         "packaging",
-        "pandas",
+        "pandas>=2.2",
         "psycopg2-binary",
         "python-dateutil",
         "requests",
         "scipy",
-        "Shapely",
+        "Shapely>=2.0",
         "sqlalchemy"
     ],
+    extras_require={
+        "fastjsonschema": ["fastjsonschema"],
+        "orjson": ["orjson"],
+        "parquet": ["pyarrow"],
+        "zstd": ["zstandard"]
+    },
     classifiers=[
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,105 @@
+import copy
+import uuid
+
+import pytest
+
+import mds.schemas
+from mds.schemas import Schema
+
+
+DEFINITIONS = {
+    "uuid": {
+        "type": "string",
+        "pattern": "^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+    },
+    "timestamp": {"type": "number", "minimum": 1000000000000, "maximum": 99999999999999},
+    "propulsion_type": {
+        "type": "array",
+        "items": {"type": "string", "enum": ["human", "electric", "combustion"]},
+        "minItems": 1
+    },
+    "vehicle_type": {"type": "string", "enum": ["bicycle", "car", "scooter"]},
+    "version": {"type": "string", "pattern": "^0\\.4\\.[0-9]+$"}
+}
+
+TRIP = {
+    "type": "object",
+    "required": ["provider_id", "device_id", "vehicle_type", "propulsion_type", "trip_duration", "start_time",
+                 "end_time"],
+    "properties": {
+        "provider_id": {"$ref": "#/definitions/uuid"},
+        "device_id": {"$ref": "#/definitions/uuid"},
+        "vehicle_type": {"$ref": "#/definitions/vehicle_type"},
+        "propulsion_type": {"$ref": "#/definitions/propulsion_type"},
+        "trip_duration": {"type": "integer"},
+        "start_time": {"$ref": "#/definitions/timestamp"},
+        "end_time": {"$ref": "#/definitions/timestamp"},
+        "publication_time": {"$ref": "#/definitions/timestamp"},
+        "route": {
+            "type": "object",
+            "required": ["type", "features"],
+            "properties": {
+                "type": {"type": "string", "enum": ["FeatureCollection"]},
+                "features": {"type": "array", "minItems": 2, "items": {"type": "object"}}
+            }
+        }
+    }
+}
+
+TRIPS = {
+    "$id": "https://example.com/trips.json",
+    "$schema": "http://json-schema.org/draft-06/schema#",
+    "type": "object",
+    "definitions": DEFINITIONS,
+    "required": ["version", "data"],
+    "properties": {
+        "version": {"$ref": "#/definitions/version"},
+        "data": {
+            "type": "object",
+            "required": ["trips"],
+            "properties": {"trips": {"type": "array", "items": TRIP}}
+        }
+    }
+}
+
+
+@pytest.fixture
+def trips_schema():
+    """
+    A trips Schema with a small, local schema document.
+    """
+    mds.schemas._VALIDATORS.clear()
+    schema = Schema("trips", "0.4.0")
+    schema._schema = copy.deepcopy(TRIPS)
+    yield schema
+    mds.schemas._VALIDATORS.clear()
+
+
+def _trip(**kwargs):
+    record = {
+        "provider_id": str(uuid.uuid4()),
+        "device_id": str(uuid.uuid4()),
+        "vehicle_type": "scooter",
+        "propulsion_type": ["electric"],
+        "trip_duration": 60,
+        "start_time": 1546300800000,
+        "end_time": 1546300860000
+    }
+    record.update(kwargs)
+    return record
+
+
+@pytest.fixture
+def trip():
+    """
+    Make a valid trip record, with any fields overridden.
+    """
+    return _trip
+
+
+@pytest.fixture
+def trips_page():
+    """
+    Make a trips payload of the given records.
+    """
+    return lambda *records: {"version": "0.4.0", "data": {"trips": list(records)}}
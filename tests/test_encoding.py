@@ -0,0 +1,33 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from mds.encoding import TimestampEncoder
+
+
+@pytest.mark.parametrize("values", [
+    pd.Series([pd.Timestamp(1546300800000, unit="ms", tz="UTC"), pd.NaT]),
+    pd.Series([datetime.datetime(2019, 1, 1, tzinfo=datetime.timezone.utc), None]),
+    pd.Series([pd.Timestamp("2019-01-01T00:00:00Z"), pd.Timestamp("2019-01-01T01:00:00+01:00"), None],
+              dtype=object),
+])
+def test_encode_many_missing(values):
+    encoded = TimestampEncoder(date_format="unix").encode_many(values)
+
+    assert encoded.index.equals(values.index)
+    assert encoded.iloc[0] == "1546300800000"
+    assert encoded.iloc[-1] is None
+
+
+def test_encode_many_missing_naive():
+    encoder = TimestampEncoder(date_format="unix")
+    values = pd.Series([datetime.datetime(2019, 1, 1), None])
+
+    assert encoder.encode_many(values).tolist() == [encoder.encode(values[0]), None]
+
+
+def test_encode_many_missing_iso8601():
+    encoded = TimestampEncoder(date_format="iso8601").encode_many([pd.Timestamp("2019-01-01T00:00:00Z"), pd.NaT])
+
+    assert encoded.tolist() == ["2019-01-01T00:00:00+00:00", None]
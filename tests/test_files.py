@@ -0,0 +1,57 @@
+import datetime
+import time
+
+import pytest
+
+from mds.files import DataFile, IndexFile
+
+
+def test_dump_payloads_compression_contradicts_file_name(tmp_path, trips_page, trip):
+    datafile = DataFile("trips")
+    page = trips_page(trip())
+
+    with pytest.raises(ValueError):
+        datafile.dump_payloads(page, output_dir=tmp_path, file_name="x.json", compression="gzip")
+    assert list(tmp_path.iterdir()) == []
+
+    path = datafile.dump_payloads(page, output_dir=tmp_path, file_name="x.json.gz", compression="gzip")
+    assert path.name == "x.json.gz"
+    assert DataFile("trips", path).load_payloads() == [page]
+
+
+def test_dump_payloads_append(tmp_path, trips_page, trip):
+    datafile = DataFile("trips")
+    first, second = trips_page(trip()), trips_page(trip())
+
+    with pytest.raises(ValueError):
+        datafile.dump_payloads(first, output_dir=tmp_path, file_name="x.json", append=True)
+
+    datafile.dump_payloads(first, output_dir=tmp_path, file_name="x.ndjson", ndjson=True)
+    path = datafile.dump_payloads(second, output_dir=tmp_path, file_name="x.ndjson", ndjson=True, append=True)
+    assert DataFile("trips", path).load_payloads() == [first, second]
+
+
+def test_dump_payloads_keeps_existing_files(tmp_path, trips_page, trip):
+    datafile = DataFile("trips")
+    pages = [trips_page(trip()), trips_page(trip())]
+
+    datafile.dump_payloads(pages, output_dir=tmp_path, file_name="x.json", single_file=False)
+    datafile.dump_payloads(pages, output_dir=tmp_path, file_name="x.json", single_file=False, parallel=2)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["x.json", "x_1.json", "x_2.json", "x_3.json"]
+    assert sorted(map(str, DataFile("trips", tmp_path).load_payloads())) == sorted(map(str, pages + pages))
+
+
+def test_index_naive_datetimes_are_utc(monkeypatch, tmp_path, trips_page, trip):
+    monkeypatch.setenv("TZ", "America/Los_Angeles")
+    time.tzset()
+    try:
+        # a trip ending 2019-01-01T00:01:00Z
+        DataFile("trips").dump_payloads(trips_page(trip()), output_dir=tmp_path, index=True)
+        index = IndexFile(tmp_path)
+
+        assert len(index.find(start_time=datetime.datetime(2019, 1, 1, 0, 1))) == 1
+        assert len(index.find(start_time=datetime.datetime(2019, 1, 1, 0, 2))) == 0
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+import requests
+
+import mds.github
+from mds.schemas import Schema
+
+
+def test_prefetch_and_seed(monkeypatch, tmp_path):
+    monkeypatch.setenv("MDS_CACHE_DIR", str(tmp_path / "connected"))
+    monkeypatch.setattr(mds.github, "_request", lambda url: json.dumps({"url": url}).encode())
+
+    paths = mds.github.prefetch(["0.3.2", "0.4.1"])
+    assert len(paths) == 1 + 2 + 1 + 4
+    assert all(p.is_file() for p in paths)
+
+    def request(url):
+        raise requests.exceptions.ConnectionError(url)
+    monkeypatch.setattr(mds.github, "_request", request)
+    monkeypatch.setenv("MDS_CACHE_DIR", str(tmp_path / "offline"))
+
+    with pytest.raises(ValueError):
+        Schema("trips", "0.4.1").schema
+
+    mds.github.seed(tmp_path / "connected")
+    assert Schema("trips", "0.4.1").schema["url"] == mds.github.schema_url("trips", "0.4.1")
+
+
+def test_seed_missing_directory(tmp_path):
+    with pytest.raises(ValueError):
+        mds.github.seed(tmp_path / "missing")
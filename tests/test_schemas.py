@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from mds.geometry import Route
+from mds.schemas import DataValidator
+
+
+def test_fastjsonschema_leaves_schema_intact(trips_schema, trip, trips_page):
+    pytest.importorskip("fastjsonschema")
+    page = trips_page(trip(), trip(device_id="not-a-uuid"))
+    refs = trips_schema.schema["properties"]["version"]["$ref"]
+
+    errors = list(DataValidator(trips_schema, backend="fastjsonschema").validate(page))
+    assert len(errors) == 1
+    assert trips_schema.schema["properties"]["version"]["$ref"] == refs
+
+    errors = list(DataValidator(trips_schema, backend="fastpath").validate(page))
+    assert len(errors) == 1
+
+    df = pd.DataFrame(page["data"]["trips"])
+    mask, errors = DataValidator(trips_schema).validate_dataframe(df)
+    assert mask.tolist() == [True, False]
+    assert errors[["field", "check"]].values.tolist() == [["device_id", "pattern"]]
+
+
+def test_validate_dataframe_duplicate_index(trips_schema, trip):
+    df = pd.concat([
+        pd.DataFrame([trip(), trip(propulsion_type=["warp"])]),
+        pd.DataFrame([trip(propulsion_type="electric"), trip(propulsion_type=[])])
+    ])
+    assert df.index.tolist() == [0, 1, 0, 1]
+
+    mask, errors = DataValidator(trips_schema).validate_dataframe(df)
+
+    assert mask.index.equals(df.index)
+    assert mask.tolist() == [True, False, False, False]
+    assert errors[["field", "check", "count"]].values.tolist() == [
+        ["propulsion_type", "type", 1],
+        ["propulsion_type", "minItems", 1],
+        ["propulsion_type", "enum", 1],
+    ]
+
+
+def test_validate_dataframe_bool_is_not_a_number(trips_schema, trip):
+    df = pd.DataFrame([trip(), trip(trip_duration=True)])
+
+    mask, errors = DataValidator(trips_schema).validate_dataframe(df)
+
+    assert mask.tolist() == [True, False]
+    assert errors[["field", "check"]].values.tolist() == [["trip_duration", "type"]]
+
+
+def test_validate_dataframe_combines_type_checks(trips_schema, trip):
+    df = pd.DataFrame([trip(trip_duration="x"), trip(trip_duration=1.5), trip()])
+
+    mask, errors = DataValidator(trips_schema).validate_dataframe(df)
+
+    assert mask.tolist() == [False, False, True]
+    assert errors[["field", "check", "count"]].values.tolist() == [["trip_duration", "type", 2]]
+
+
+@pytest.mark.parametrize("backend", [None, "fastjsonschema", "fastpath"])
+def test_validate_compact_geometry(trips_schema, trip, trips_page, backend):
+    if backend == "fastjsonschema":
+        pytest.importorskip("fastjsonschema")
+    route = Route([(-118.49, 34.01), (-118.48, 34.02)])
+    page = trips_page(trip(route=route), trip(route=Route([(-118.49, 34.01)])))
+
+    errors = list(DataValidator(trips_schema, backend=backend).validate(page))
+
+    assert [list(e.path) for e in errors] == [["data", "trips", 1, "route", "features"]]
+    assert page["data"]["trips"][0]["route"] is route
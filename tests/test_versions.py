@@ -0,0 +1,21 @@
+import pickle
+
+import pytest
+
+from mds.versions import Version
+
+
+@pytest.mark.parametrize("version", ["0.3.2", "0.4.0-alpha1", "0.4.0rc1", "0.3.x", "0.3", "0.x"])
+def test_pickle(version):
+    original = Version(version)
+    unpickled = pickle.loads(pickle.dumps(original))
+
+    assert unpickled == original
+    assert unpickled.tuple == original.tuple
+    assert str(unpickled) == str(original)
+
+
+def test_pickle_prerelease_sorts_before_release():
+    unpickled = pickle.loads(pickle.dumps(Version("0.4.0-alpha1")))
+
+    assert unpickled < Version("0.4.0")